@@ -0,0 +1,277 @@
+"""
+Monte Carlo balancing: play many headless games over a parameter grid.
+
+A grid file (JSON) lists class attributes to vary, scripted tower
+placements and how many seeds to play each combination with:
+
+    {
+      "params": {
+        "Tower.DAMAGE_BY_RANK": [[10, 20, 35], [12, 24, 40]],
+        "Tower.RANGE_BY_RANK": [[140, 190, 240]],
+        "Tower.COOLDOWN_BY_RANK": [[0.8, 0.6, 0.4]],
+        "Arrow.enemy_modifiers": [{"Viking": 1.3, "Golem": 0.8}],
+        "Golem.GOLD_REWARD": [20, 25],
+        "Simulation.WAVES": ["assets/waves.json", "hard_waves.json"]
+      },
+      "placements": {
+        "river": [[0, "tower", 300, 300], [20, "tower", 700, 300],
+                  [60, "upgrade", 300, 300]]
+      },
+      "seeds": 8, "jitter": 15, "money": 200,
+      "max_seconds": 900, "sample_every": 10
+    }
+
+``Simulation.WAVES`` picks the wave file (see ``main.Waves``). Placement
+actions are ``[sim seconds, "tower" | "upgrade", x, y]``. The simulation
+itself is deterministic; the seed jitters every placement by up to
+``jitter`` px, so seeds sample nearby layouts. Games run in a process pool
+and each outcome is appended as it arrives to a columnar results directory
+(one raw file per column, see ``load_results``); an interrupted run keeps
+the rows it finished.
+
+    python balance.py grid.json --out balance_results -j 32
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np  # noqa: E402
+
+import main  # noqa: E402
+
+# Scalar columns of the results directory: name -> dtype.
+COLUMNS = {
+    "config": "int32",
+    "placement": "int32",
+    "seed": "int32",
+    "waves_survived": "int16",
+    "wave_reached": "int16",
+    "health": "int32",
+    "won": "bool",
+    "sim_seconds": "float32",
+    "towers": "int16",
+}
+
+
+_INHERITED = object()  # marks an attribute not set on the class itself
+
+
+def _decode(name, value, current):
+    """JSON value for attribute ``name`` in the attribute's own shape."""
+    if name == "Arrow.enemy_modifiers":
+        return {getattr(main, cls): mult for cls, mult in value.items()}
+    if isinstance(current, tuple):
+        return tuple(value)
+    return value
+
+
+@contextmanager
+def overridden(params):
+    """Temporarily set ``{"Class.ATTR": value}`` on the classes in main."""
+    saved = []
+    try:
+        for name, value in params.items():
+            cls_name, attr = name.split(".")
+            cls = getattr(main, cls_name)
+            current = getattr(cls, attr)
+            # Inherited attributes are deleted again, not pinned on the subclass.
+            saved.append((cls, attr, cls.__dict__.get(attr, _INHERITED)))
+            setattr(cls, attr, _decode(name, value, current))
+        yield
+    finally:
+        for cls, attr, value in reversed(saved):
+            if value is _INHERITED:
+                delattr(cls, attr)
+            else:
+                setattr(cls, attr, value)
+
+
+def _sampling(settings):
+    """``(ticks between gold samples, samples per game)`` for ``settings``."""
+    sample_ticks = round(settings["sample_every"] * main.Simulation.TICK_RATE)
+    max_ticks = int(settings["max_seconds"] * main.Simulation.TICK_RATE)
+    return sample_ticks, max_ticks // sample_ticks + 1
+
+
+def play(job):
+    """Play one game; returns its outcome row (runs in a worker process)."""
+    config, params, placement, script, seed, settings = job
+    rng = random.Random(seed)
+    jitter = settings["jitter"]
+    spots = {}  # scripted (x, y) -> jittered position, shared by upgrades
+
+    def spot(x, y):
+        if (x, y) not in spots:
+            spots[x, y] = (x + rng.randint(-jitter, jitter), y + rng.randint(-jitter, jitter))
+        return spots[x, y]
+
+    sample_ticks, samples = _sampling(settings)
+    gold = np.zeros(samples, dtype=np.int32)
+    with overridden(params):
+        sim = main.Simulation(money=settings["money"])
+        actions = sorted(script, key=lambda action: action[0])
+        max_ticks = int(settings["max_seconds"] * sim.FPS)
+        towers = 0
+        while True:
+            while actions and actions[0][0] <= sim.time:
+                _, kind, x, y = actions.pop(0)
+                if kind == "tower":
+                    towers += sim.spawn_tower(spot(x, y)) is not None
+                else:
+                    sim.upgrade_tower(spot(x, y))
+            if sim.tick % sample_ticks == 0:
+                gold[sim.tick // sample_ticks] = sim.money
+            if sim.finished or sim.tick >= max_ticks:
+                break
+            sim.step()
+        gold[sim.tick // sample_ticks + 1 :] = sim.money
+        won = sim.finished and sim.health > 0
+    return {
+        "config": config,
+        "placement": placement,
+        "seed": seed,
+        "waves_survived": sim.wave_count if won else sim.wave_number - 1,
+        "wave_reached": sim.wave_number,
+        "health": sim.health,
+        "won": won,
+        "sim_seconds": sim.time,
+        "towers": towers,
+        "gold": gold,
+    }
+
+
+def expand(spec):
+    """``(configs, placement names, jobs)`` for every grid point, placement and seed."""
+    names = sorted(spec["params"])
+    configs = [
+        dict(zip(names, values))
+        for values in itertools.product(*(spec["params"][name] for name in names))
+    ]
+    placements = sorted(spec["placements"])
+    settings = {
+        "jitter": spec.get("jitter", 0),
+        "money": spec.get("money", 200),
+        "max_seconds": spec.get("max_seconds", 900),
+        "sample_every": spec.get("sample_every", 10),
+    }
+    if settings["sample_every"] * main.Simulation.TICK_RATE < 1:
+        raise ValueError(
+            f"sample_every must be at least one tick (1/{main.Simulation.TICK_RATE} s)"
+        )
+    jobs = [
+        (c, params, p, spec["placements"][name], seed, settings)
+        for c, params in enumerate(configs)
+        for p, name in enumerate(placements)
+        for seed in range(spec.get("seeds", 1))
+    ]
+    return configs, placements, jobs
+
+
+class ResultWriter:
+    """Appends outcome rows column by column to raw files under ``directory``."""
+
+    def __init__(self, directory, configs, placements, samples):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.schema = {
+            "columns": COLUMNS | {"gold": "int32"},
+            "gold_samples": samples,
+            "configs": configs,
+            "placements": placements,
+        }
+        self._write_schema()
+        self._files = {
+            name: (self.directory / f"{name}.bin").open("wb")
+            for name in [*COLUMNS, "gold"]
+        }
+        self.rows = 0
+
+    def append(self, row):
+        for name, dtype in COLUMNS.items():
+            self._files[name].write(np.asarray(row[name], dtype=dtype).tobytes())
+        self._files["gold"].write(row["gold"].tobytes())
+        self.rows += 1
+
+    def _write_schema(self):
+        (self.directory / "schema.json").write_text(json.dumps(self.schema, indent=1))
+
+    def close(self):
+        """Close the column files and record how many rows they all hold."""
+        for fh in self._files.values():
+            fh.close()
+        self.schema["rows"] = self.rows
+        self._write_schema()
+
+
+def load_results(directory):
+    """Columns of a results directory as numpy arrays (``gold`` is 2-D).
+
+    Columns are written separately, so a run that stopped mid-row leaves
+    files of different lengths. Every column is cut to the row count the
+    writer recorded on close, or, if it never got that far (killed), to the
+    rows complete in every file.
+    """
+    directory = Path(directory)
+    schema = json.loads((directory / "schema.json").read_text())
+    widths = {name: 1 for name in schema["columns"]} | {"gold": schema["gold_samples"]}
+    rows = schema.get("rows")
+    if rows is None:
+        rows = min(
+            (directory / f"{name}.bin").stat().st_size
+            // (np.dtype(dtype).itemsize * widths[name])
+            for name, dtype in schema["columns"].items()
+        )
+    columns = {
+        name: np.fromfile(directory / f"{name}.bin", dtype=dtype, count=rows * widths[name])
+        for name, dtype in schema["columns"].items()
+    }
+    columns["gold"] = columns["gold"].reshape(rows, schema["gold_samples"])
+    return columns
+
+
+def run(spec, out, workers=None):
+    """Play every job of ``spec`` on ``workers`` processes, streaming to ``out``."""
+    configs, placements, jobs = expand(spec)
+    settings = jobs[0][-1] if jobs else {"max_seconds": 0, "sample_every": 1}
+    _, samples = _sampling(settings)
+    writer = ResultWriter(out, configs, placements, samples)
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))
+            for row in pool.map(play, jobs, chunksize=chunksize):
+                writer.append(row)
+                if writer.rows % 100 == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"{writer.rows}/{len(jobs)} games, {writer.rows / elapsed:.1f}/s")
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("grid", help="grid spec (JSON)")
+    parser.add_argument("--out", default="balance_results", help="results directory")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    spec = json.loads(Path(args.grid).read_text())
+    rows = run(spec, args.out, workers=args.jobs)
+    print(f"{rows} games written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,265 @@
+"""
+Headless benchmark scenarios for the simulation and renderer.
+
+Each scenario builds a reproducible game state (towers along the route,
+enemies spread over it, ...) under SDL's dummy video driver, steps it a
+fixed number of ticks and reports ticks/sec, p50/p99 tick time and
+allocation figures. Results go to a JSON file; with ``--baseline`` the run
+fails (exit code 1) when a scenario regresses past the stored numbers.
+
+    python bench.py                                  # all scenarios
+    python bench.py --scenario arrows --ticks 2000
+    python bench.py --save-baseline bench_baseline.json
+    python bench.py --baseline bench_baseline.json --tolerance 0.2
+    python bench.py --imports                        # start-up cost only
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+import main  # noqa: E402
+
+
+def _populate(sim, n_towers, n_enemies, on_fire=False, hp=10**9):
+    """Spread towers and enemies along the level route.
+
+    Enemies get effectively infinite HP and are placed on the first
+    ``length - 600`` px, so none die or leave during a run and the workload
+    stays constant.
+    """
+    route = sim.enemies.routes[sim.enemies.route(main.get_path)]
+    for i in range(n_towers):
+        x, y = route.position(route.length * (i + 0.5) / max(1, n_towers))
+        sim.money += main.Tower.PRICE
+        sim.spawn_tower((int(x), int(y) + 60))
+    span = max(1.0, route.length - 600)
+    for i in range(n_enemies):
+        enemy_class = main.Viking if i % 2 else main.Golem
+        enemy = enemy_class(parent=sim, left=bool(i % 2))
+        enemy.progress = span * i / max(1, n_enemies)
+        enemy.hp = hp
+        sim.add_enemy(enemy)
+        if on_fire:
+            enemy._on_fire = True
+            enemy.put_on_fire()
+    # Clear the scripted waves so only the scenario's enemies are on the field.
+    sim.scheduler = main.Scheduler()
+    sim._wave_pending_spawns = 0
+    sim.wave_number = sim.wave_count
+
+
+def _sim_scenario(n_towers, n_enemies, on_fire=False):
+    def build():
+        sim = main.Simulation()
+        _populate(sim, n_towers, n_enemies, on_fire=on_fire)
+        return sim.step
+
+    return build
+
+
+def _render_scenario(n_towers, n_enemies, dirty_rects=False):
+    def build():
+        pygame.init()
+        pygame.font.init()
+        game = main.Game(source="assets/level", dirty_rects=dirty_rects)
+        game.preloader.wait()
+        _populate(game.sim, n_towers, n_enemies)
+
+        def frame():
+            game.update(game.sim.DT)
+            game.render()
+
+        return frame
+
+    return build
+
+
+SCENARIOS = {
+    # name: (builder, description)
+    "enemies": (_sim_scenario(0, 1000), "1000 walking enemies, no towers"),
+    "towers": (_sim_scenario(50, 500), "50 towers targeting 500 enemies"),
+    "arrows": (_sim_scenario(120, 300), "sustained arrow fire from 120 towers"),
+    "effects": (_sim_scenario(0, 300, on_fire=True), "300 burning enemies"),
+    "render": (_render_scenario(30, 200), "full repaint, 30 towers, 200 enemies"),
+    "render-dirty": (
+        _render_scenario(30, 200, dirty_rects=True),
+        "dirty-rect repaint, 30 towers, 200 enemies",
+    ),
+}
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of ``samples`` (q in 0..100)."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_scenario(name, ticks=1000, warmup=60, alloc_ticks=100):
+    """Time ``ticks`` steps of scenario ``name`` and return its metrics."""
+    builder, description = SCENARIOS[name]
+    step = builder()
+    for _ in range(warmup):
+        step()
+
+    gc_before = sum(s["collections"] for s in gc.get_stats())
+    durations = []
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(ticks):
+        t0 = clock()
+        step()
+        durations.append(clock() - t0)
+    elapsed = clock() - start
+    gc_runs = sum(s["collections"] for s in gc.get_stats()) - gc_before
+
+    # Separate pass: tracemalloc slows everything down too much to time with it.
+    tracemalloc.start()
+    for _ in range(alloc_ticks):
+        step()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "description": description,
+        "ticks": ticks,
+        "ticks_per_sec": ticks / elapsed,
+        "p50_ms": percentile(durations, 50) * 1000,
+        "p99_ms": percentile(durations, 99) * 1000,
+        "gc_collections": gc_runs,
+        "alloc_peak_kib": peak / 1024,
+        "alloc_retained_kib": current / 1024,
+    }
+
+
+# What a fresh process does before its first frame (run with -c).
+FIRST_FRAME = """
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame, main
+pygame.init()
+game = main.Game(source="assets/level", preload=False)
+game.update(0)
+game.render()
+"""
+
+
+def import_report(module="main", runs=3):
+    """``[(name, self_ms, cumulative_ms)]`` of ``python -X importtime -c 'import module'``.
+
+    Lists ``module`` itself and what it imports directly, slowest first, for
+    the fastest of ``runs`` fresh interpreters.
+    """
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, check=True,
+        )
+        lines = [
+            line[len("import time:"):].split("|")
+            for line in proc.stderr.splitlines()
+            if line.startswith("import time:") and "self [us]" not in line
+        ]
+        # Children are listed (indented) right before their importer; walk
+        # back from ``module`` to the previous top-level import.
+        rows = []
+        for self_us, cumulative_us, name in reversed(lines):
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            if depth == 0 and rows:
+                break
+            if rows or (depth == 0 and name.strip() == module):
+                if depth <= 1:
+                    rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+        total = rows[0][2]
+        if best is None or total < best[0]:
+            best = (total, rows)
+    return sorted(best[1], key=lambda row: -row[2])
+
+
+def first_frame_seconds(runs=3):
+    """Fastest wall time of a fresh interpreter importing main and drawing one frame."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", FIRST_FRAME], check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def regressions(results, baseline, tolerance=0.2):
+    """Messages for every scenario slower than ``baseline`` by more than ``tolerance``."""
+    problems = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["ticks_per_sec"] < base["ticks_per_sec"] * (1 - tolerance):
+            problems.append(
+                f"{name}: {result['ticks_per_sec']:.0f} ticks/s "
+                f"< baseline {base['ticks_per_sec']:.0f}"
+            )
+        if result["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            problems.append(
+                f"{name}: p99 {result['p99_ms']:.2f} ms > baseline {base['p99_ms']:.2f} ms"
+            )
+    return problems
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--scenario", action="append", choices=sorted(SCENARIOS), help="repeatable"
+    )
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="fail if slower than this results file")
+    parser.add_argument("--save-baseline", help="also write the results here")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument(
+        "--imports", action="store_true", help="report import and first-frame times only"
+    )
+    args = parser.parse_args(argv)
+
+    if args.imports:
+        for name, self_ms, cumulative_ms in import_report()[:15]:
+            print(f"{name:30s} {cumulative_ms:8.1f} ms  (self {self_ms:.1f} ms)")
+        print(f"{'time to first frame':30s} {first_frame_seconds() * 1000:8.1f} ms")
+        return 0
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results[name] = run_scenario(name, ticks=args.ticks)
+        r = results[name]
+        print(
+            f"{name:13s} {r['ticks_per_sec']:9.0f} ticks/s  "
+            f"p50 {r['p50_ms']:7.3f} ms  p99 {r['p99_ms']:7.3f} ms  "
+            f"peak {r['alloc_peak_kib']:8.0f} KiB  gc {r['gc_collections']}"
+        )
+
+    for path in filter(None, [args.out, args.save_baseline]):
+        Path(path).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        problems = regressions(
+            results, json.loads(Path(args.baseline).read_text()), args.tolerance
+        )
+        for problem in problems:
+            print("REGRESSION", problem)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
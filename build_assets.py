@@ -0,0 +1,116 @@
+"""
+Batch-build animation frames from the source sheets and GIFs.
+
+Each source image is decoded and converted to RGBA once in this process;
+the crop of every zone / GIF frame is then keyed out (``make_transparent``),
+trimmed (``strip_frame``) and saved by a pool of worker processes. Frames
+are written to a temporary file and renamed into place, and frames newer
+than their source are skipped unless ``--force`` is given.
+
+    python build_assets.py                # everything in SHEETS and GIFS
+    python build_assets.py fire_sheet -j 4
+    python build_assets.py --force
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+from gif2png import GIFS
+from sheet2pngs import SHEETS, frame_path, make_transparent, strip_frame
+
+
+def build_frame(frame, transparent_color, out_path):
+    """Key out, trim and atomically save one cropped RGBA frame (worker side)."""
+    out_path = Path(out_path)
+    frame = strip_frame(make_transparent(frame, transparent_color=transparent_color))
+    tmp = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+    try:
+        frame.save(tmp, format="PNG")
+        os.replace(tmp, out_path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return out_path
+
+
+def _up_to_date(source, out_path):
+    return out_path.exists() and out_path.stat().st_mtime > source.stat().st_mtime
+
+
+def sheet_jobs(sheet_path, crop_zones, transparent_color, force=False):
+    """``build_frame`` arguments for every stale zone of a sprite sheet."""
+    source = Path(sheet_path)
+    stale = [
+        (i, zone) for i, zone in enumerate(crop_zones)
+        if force or not _up_to_date(source, frame_path(source, i))
+    ]
+    if not stale:
+        return
+    with Image.open(source) as image:
+        sheet = image.convert("RGBA")  # once per sheet, not per zone
+    for i, zone in stale:
+        yield sheet.crop(zone), transparent_color, frame_path(source, i)
+
+
+def gif_jobs(gif_path, crop_window, transparent_color, force=False):
+    """``build_frame`` arguments for every stale frame of a GIF."""
+    source = Path(gif_path)
+    with Image.open(source) as gif:
+        for i in range(gif.n_frames):
+            out_path = frame_path(source, i)
+            if not force and _up_to_date(source, out_path):
+                continue
+            gif.seek(i)
+            frame = gif.convert("RGBA")
+            if crop_window:
+                frame = frame.crop(crop_window)
+            yield frame, transparent_color, out_path
+
+
+def all_jobs(names=None, force=False):
+    """Jobs for the sources whose file stem is in ``names`` (all if None)."""
+    def wanted(path):
+        return names is None or Path(path).stem in names
+
+    for path, (zones, color) in SHEETS.items():
+        if wanted(path):
+            yield from sheet_jobs(path, zones, color, force=force)
+    for path, (window, color) in GIFS.items():
+        if wanted(path):
+            yield from gif_jobs(path, window, color, force=force)
+
+
+def build(jobs, workers=None):
+    """Run ``build_frame`` over ``jobs`` on ``workers`` processes; returns written paths."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Submit as the sources are decoded so workers start on the first crops.
+        futures = [pool.submit(build_frame, *job) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def main_cli(argv=None):
+    sources = sorted(Path(p).stem for p in [*SHEETS, *GIFS])
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("sources", nargs="*", metavar="SOURCE",
+                        help=f"only these sources ({', '.join(sources)})")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild frames even if newer than their source")
+    args = parser.parse_args(argv)
+    unknown = set(args.sources) - set(sources)
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(sorted(unknown))}")
+
+    written = build(all_jobs(args.sources or None, force=args.force), workers=args.jobs)
+    for path in written:
+        print(path)
+    print(f"{len(written)} frame(s) written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
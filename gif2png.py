@@ -1,9 +1,9 @@
 from PIL import Image
 import numpy as np
 from pathlib import Path
-from sheet2pngs import strip_frame, make_transparent
+from sheet2pngs import frame_path, strip_frame, make_transparent
 
-def gif_splitter(gif_path, crop_window=(170, 75, 450, 295), transparent_color=None):
+def gif_splitter(gif_path, crop_window=(170, 75, 450, 295), transparent_color=(222, 222, 222)):
     path = Path(gif_path)
     gif = Image.open(path)
 
@@ -17,14 +17,13 @@ def gif_splitter(gif_path, crop_window=(170, 75, 450, 295), transparent_color=No
             frame = frame.crop(crop_window)
         # frame.show()
         # break
-        # replace (222,222,222) with transparent pixels
-        frame = make_transparent(frame)
+        # replace transparent_color with transparent pixels
+        frame = make_transparent(frame, transparent_color=transparent_color)
         frames.append(frame)
         
         frame_red = strip_frame(frame)
         # save frames as png
-        frame_path = path.parent / f"{path.parent.stem}_{i:02d}.png"
-        frame_red.save(frame_path)
+        frame_red.save(frame_path(path, i))
 
 
 
@@ -35,6 +34,12 @@ def gif_splitter(gif_path, crop_window=(170, 75, 450, 295), transparent_color=No
     frames[0].save(path.parent / (path.parent.stem + '_new.gif'), append_images=frames[1:], save_all=True, duration=100, loop=0)
 
 
+# source gifs: path -> (crop window, transparent color)
+GIFS = {
+    'assets/sprites/golem/golem.gif': ((170, 75, 450, 295), (222, 222, 222)),
+}
+
+
 if __name__ == "__main__":
     gif_path = 'assets/sprites/golem/golem.gif'
     gif_splitter(gif_path)
\ No newline at end of file
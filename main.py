@@ -1,11 +1,24 @@
 from typing import Any
+import atexit
+import bisect
+import heapq
+import itertools
+import json
+import math
+import os
 import pygame
-from collections import deque
+import struct
+import sys
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from functools import cached_property
 import numpy as np
 from pathlib import Path
 import time
-from PIL import Image
+
+# Imported where used, to keep start-up (and short headless runs) quick:
+# PIL (image fallback, atlas packing), threading/queue (Preloader),
+# mmap/hashlib (RawFrameCache), csv (profile dumps), argparse (CLI).
 
 
 def load_image_compat(path: str | Path) -> pygame.Surface:
@@ -15,9 +28,803 @@ def load_image_compat(path: str | Path) -> pygame.Surface:
         return pygame.image.load(image_path.as_posix())
     except pygame.error:
         # Fallback for environments where pygame can only load BMP natively.
+        from PIL import Image
+
         with Image.open(image_path) as pil_img:
             rgba_img = pil_img.convert("RGBA")
-            return pygame.image.fromstring(rgba_img.tobytes(), rgba_img.size, "RGBA")
+            # frombuffer keeps the bytes instead of copying them again.
+            return pygame.image.frombuffer(rgba_img.tobytes(), rgba_img.size, "RGBA")
+
+
+class FrameCache:
+    """Process-wide LRU store of loaded + scaled sprite frames.
+
+    Keyed by ``(source directory, frame index, target size)`` so every sprite
+    sharing a source gets the same Surface objects instead of decoding and
+    rescaling its own copies. Surfaces handed out are shared: treat them as
+    read-only (``.copy()`` before drawing on one).
+
+    ``budget_bytes`` bounds the pixel memory held by the cache; least recently
+    used frames are evicted once it is exceeded. Evicting only drops the
+    cache's reference, sprites still holding a frame keep it alive.
+    """
+
+    def __init__(self, budget_bytes: int = 256 * 2**20):
+        self.budget_bytes = budget_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._frames: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __contains__(self, key):
+        return key in self._frames
+
+    @staticmethod
+    def surface_nbytes(surface: pygame.Surface) -> int:
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def get(self, key, factory) -> pygame.Surface:
+        """Return the frame stored under ``key``, building it with ``factory()`` on a miss."""
+        frame = self._frames.get(key)
+        if frame is not None:
+            self.hits += 1
+            self._frames.move_to_end(key)
+            return frame
+        self.misses += 1
+        frame = factory()
+        self._frames[key] = frame
+        self.nbytes += self.surface_nbytes(frame)
+        self._evict()
+        return frame
+
+    def _evict(self) -> None:
+        # Always keep the newest frame, even if it alone exceeds the budget.
+        while self.nbytes > self.budget_bytes and len(self._frames) > 1:
+            _, frame = self._frames.popitem(last=False)
+            self.nbytes -= self.surface_nbytes(frame)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._frames.clear()
+        self.nbytes = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "frames": len(self._frames),
+            "nbytes": self.nbytes,
+        }
+
+
+FRAMES = FrameCache()
+# Rendered text lines for the HUD, keyed (text, font, color). Most lines
+# repeat frame after frame; the LRU budget bounds the ever-changing ones.
+TEXT = FrameCache(budget_bytes=4 * 2**20)
+
+
+def render_text(font: pygame.font.Font, text: str, color) -> pygame.Surface:
+    """Antialiased ``font.render`` through the shared TEXT cache."""
+    return TEXT.get((text, font, color), lambda: font.render(text, True, color))
+
+
+class _NullSection:
+    """What ``FrameProfiler.section`` hands out while disabled: does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Section:
+    """Timer for one named stage; keeps its last ``window`` durations (s)."""
+
+    __slots__ = ("samples", "_start")
+
+    def __init__(self, window: int):
+        self.samples: deque[float] = deque(maxlen=window)
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self._start)
+        return False
+
+
+class FrameProfiler:
+    """Per-stage wall-clock timers over a rolling window of frames.
+
+    Wrap a stage in ``with PROFILER.section("draw"): ...``. While disabled
+    that hands back a shared no-op context manager, so instrumented code costs
+    one method call per stage. ``summary`` reports per-stage percentiles and a
+    histogram over ``BUCKETS_MS``; ``dump`` writes it as CSV or JSON.
+    """
+
+    # Upper bucket edges (ms) of the histograms; the last bucket is open.
+    BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33)
+    _NULL = _NullSection()
+
+    def __init__(self, window: int = 600, enabled: bool = False):
+        self.window = window
+        self.enabled = enabled
+        self.sections: dict[str, _Section] = {}
+
+    def section(self, name: str):
+        if not self.enabled:
+            return self._NULL
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = _Section(self.window)
+        return section
+
+    def reset(self) -> None:
+        self.sections.clear()
+
+    def histogram(self, name: str) -> list[int]:
+        """Sample counts per ``BUCKETS_MS`` bucket (plus the open last one)."""
+        counts = [0] * (len(self.BUCKETS_MS) + 1)
+        edges = [edge / 1000 for edge in self.BUCKETS_MS]
+        for sample in self.sections[name].samples:
+            counts[bisect.bisect_left(edges, sample)] += 1
+        return counts
+
+    def summary(self) -> dict[str, dict]:
+        """``{stage: {count, mean_ms, p50_ms, p99_ms, max_ms, histogram}}``."""
+        report = {}
+        for name, section in self.sections.items():
+            ordered = sorted(section.samples)
+            if not ordered:
+                continue
+            n = len(ordered)
+            report[name] = {
+                "count": n,
+                "mean_ms": sum(ordered) / n * 1000,
+                "p50_ms": ordered[(n - 1) // 2] * 1000,
+                "p99_ms": ordered[min(n - 1, math.ceil(0.99 * n) - 1)] * 1000,
+                "max_ms": ordered[-1] * 1000,
+                "histogram": self.histogram(name),
+            }
+        return report
+
+    def dump(self, path: str | Path) -> Path:
+        """Write ``summary()`` to ``path``: JSON for ``.json``, CSV otherwise."""
+        path = Path(path)
+        report = self.summary()
+        if path.suffix == ".json":
+            path.write_text(
+                json.dumps({"buckets_ms": self.BUCKETS_MS, "stages": report}, indent=2)
+            )
+            return path
+        buckets = [f"le_{edge}ms" for edge in self.BUCKETS_MS] + ["inf"]
+        with path.open("w", newline="") as fh:
+            import csv
+
+            writer = csv.writer(fh)
+            writer.writerow(
+                ["stage", "count", "mean_ms", "p50_ms", "p99_ms", "max_ms", *buckets]
+            )
+            for name, row in report.items():
+                writer.writerow(
+                    [name, row["count"]]
+                    + [f"{row[k]:.4f}" for k in ("mean_ms", "p50_ms", "p99_ms", "max_ms")]
+                    + row["histogram"]
+                )
+        return path
+
+
+PROFILER = FrameProfiler()
+
+
+class AssetCatalogue:
+    """Index of numbered animation frames (``*_NN.png``) under the assets tree.
+
+    The tree is walked once, on first lookup, or read from a prebuilt manifest
+    (see ``write_manifest``). Lookups are then dict hits. A source directory
+    lists every frame below it, matching the old ``rglob`` semantics.
+
+    With ``watch=True`` (development only) lookups re-stat the indexed files
+    at most every ``watch_interval`` seconds and rescan when anything changed,
+    dropping stale surfaces from ``FRAMES``.
+    """
+
+    PATTERN = "*_[0-9][0-9].png"
+    MANIFEST = "manifest.json"
+
+    def __init__(
+        self, root="assets", manifest=None, watch=False, watch_interval=1.0
+    ):
+        self.root = Path(root)
+        self.manifest = Path(manifest) if manifest else self.root / self.MANIFEST
+        self.watch = watch
+        self.watch_interval = watch_interval
+        self._frames: dict[Path, tuple[Path, ...]] | None = None
+        self._signature: dict[Path, int] = {}
+        self._last_check = 0.0
+
+    def scan(self) -> None:
+        """Walk ``root`` and index every frame under each of its directories."""
+        index: dict[Path, list[Path]] = {}
+        for frame in self.root.rglob(self.PATTERN):
+            parent = frame.parent
+            while True:
+                index.setdefault(parent, []).append(frame)
+                if parent == self.root:
+                    break
+                parent = parent.parent
+        self._frames = {d: tuple(sorted(frames)) for d, frames in index.items()}
+        if self.watch:
+            self._signature = self._stat()
+
+    def load_manifest(self, path=None) -> None:
+        path = Path(path) if path else self.manifest
+        data = json.loads(path.read_text())
+        root = Path(data["root"])
+        self._frames = {
+            root / d: tuple(root / f for f in frames)
+            for d, frames in data["frames"].items()
+        }
+
+    def write_manifest(self, path=None) -> Path:
+        """Scan the tree and write the index as JSON, paths relative to ``root``."""
+        path = Path(path) if path else self.manifest
+        self.scan()
+        frames = {
+            d.relative_to(self.root).as_posix(): [
+                f.relative_to(self.root).as_posix() for f in fs
+            ]
+            for d, fs in sorted(self._frames.items())
+        }
+        path.write_text(json.dumps({"root": self.root.as_posix(), "frames": frames}))
+        return path
+
+    def _ensure_index(self) -> None:
+        if self._frames is None:
+            if not self.watch and self.manifest.is_file():
+                self.load_manifest()
+            else:
+                self.scan()
+        elif self.watch:
+            now = time.time()
+            if now - self._last_check >= self.watch_interval:
+                self._last_check = now
+                self.refresh()
+
+    def _stat(self) -> dict[Path, int]:
+        paths = {self.root, *self._frames}
+        paths.update(f for frames in self._frames.values() for f in frames)
+        signature = {}
+        for path in paths:
+            try:
+                signature[path] = path.stat().st_mtime_ns
+            except FileNotFoundError:
+                pass
+        return signature
+
+    def refresh(self) -> bool:
+        """Rescan if any indexed file or directory changed. Returns True on rescan."""
+        if self._frames is not None and self._stat() == self._signature:
+            return False
+        self.scan()
+        FRAMES.clear()
+        return True
+
+    def frames(self, source) -> tuple[Path, ...]:
+        """Sorted frame paths under ``source`` (empty if there are none)."""
+        self._ensure_index()
+        source = Path(source)
+        frames = self._frames.get(source)
+        if frames is None:
+            # Outside the indexed tree (or empty): index it on its own, once.
+            frames = tuple(sorted(source.rglob(self.PATTERN)))
+            self._frames[source] = frames
+        return frames
+
+    def count(self, source) -> int:
+        return len(self.frames(source))
+
+
+CATALOGUE = AssetCatalogue()
+
+
+class TextureAtlas:
+    """Animation frames packed into a few atlas pages, built offline.
+
+    ``pack`` shelf-packs the frames of each source directory (tallest first)
+    into its own page(s) of at most ``PAGE_SIZE`` and writes them next to an
+    index mapping each frame path, relative to ``root``, to
+    ``[page, x, y, w, h]``, plus each source file's mtime. Frames are packed
+    untrimmed, so a frame's anchor is still its top-left corner.
+
+    At runtime ``frame(path)`` hands out a subsurface of the page holding
+    ``path``, or None when there is no index, the frame is not in it or its
+    source file changed since packing (so ``load_frame`` reads the file). Each
+    page is decoded once, on first use (``convert_alpha``'d once a display
+    exists), so a cold start opens one file per source instead of one per
+    frame.
+    """
+
+    INDEX = "atlas.json"
+    PAGE_SIZE = 4096
+    PADDING = 1
+    # Sources kept out of the atlas: the opaque level backgrounds.
+    EXCLUDE = ("level",)
+
+    def __init__(self, root="assets", enabled=True):
+        self.root = Path(root)
+        self.enabled = enabled
+        self._index: dict[str, list[int]] | None = None
+        self._page_files: list[str] = []
+        self._pages: dict[int, pygame.Surface] = {}
+        self._converted: set[int] = set()
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / self.INDEX
+
+    def pack(self, catalogue: AssetCatalogue | None = None) -> Path:
+        """Pack the frames under ``root`` into pages and write the index."""
+        from PIL import Image
+
+        catalogue = catalogue or AssetCatalogue(self.root)
+        paths = [
+            path
+            for path in catalogue.frames(self.root)
+            if not any(part in self.EXCLUDE for part in path.relative_to(self.root).parts)
+        ]
+        images = {}
+        for path in paths:
+            with Image.open(path) as image:
+                images[path] = image.convert("RGBA")
+        by_source: dict[Path, list[Path]] = {}
+        for path in paths:
+            by_source.setdefault(path.parent, []).append(path)
+
+        # One source per page (or a few, if it overflows PAGE_SIZE), so that
+        # a page is only decoded once something actually draws that source.
+        placements: dict[Path, list[int]] = {}
+        pages: list[list[Path]] = []
+        for members in by_source.values():
+            members = sorted(members, key=lambda p: (-images[p].height, p))
+            spots = self._shelf_pack([images[p].size for p in members])
+            first = len(pages)
+            for path, (page, x, y) in zip(members, spots):
+                if first + page == len(pages):
+                    pages.append([])
+                placements[path] = [first + page, x, y, *images[path].size]
+                pages[first + page].append(path)
+
+        for stale in self.root.glob("atlas-*.png"):
+            stale.unlink()
+        page_files = []
+        for i, members in enumerate(pages):
+            width = max(placements[p][1] + placements[p][3] for p in members)
+            height = max(placements[p][2] + placements[p][4] for p in members)
+            page = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+            for path in members:
+                page.paste(images[path], tuple(placements[path][1:3]))
+            name = f"atlas-{i}.png"
+            page.save(self.root / name)
+            page_files.append(name)
+
+        frames = {
+            path.relative_to(self.root).as_posix(): placement
+            for path, placement in sorted(placements.items())
+        }
+        mtimes = {key: self._mtime(key) for key in frames}
+        self.index_path.write_text(
+            json.dumps({"pages": page_files, "frames": frames, "mtimes": mtimes})
+        )
+        self.clear()
+        return self.index_path
+
+    @classmethod
+    def _shelf_pack(cls, sizes: list[tuple[int, int]]) -> list[tuple[int, int, int]]:
+        """``(page, x, y)`` for each of ``sizes`` (sorted tallest first).
+
+        Tries shelf widths of 1, 2, 3... of the widest frame and keeps the
+        layout whose pages cover the fewest pixels.
+        """
+        pad, limit = cls.PADDING, cls.PAGE_SIZE
+        widest = max(w for w, _ in sizes)
+        best, best_area = None, math.inf
+        for columns in range(1, len(sizes) + 1):
+            width = min(limit, columns * (widest + pad))
+            spots, extents = [], [[0, 0]]
+            x = y = shelf = 0
+            for w, h in sizes:
+                if x + w > width:  # next shelf
+                    x, y, shelf = 0, y + shelf + pad, 0
+                if y + h > limit:  # next page
+                    extents.append([0, 0])
+                    x = y = shelf = 0
+                spots.append((len(extents) - 1, x, y))
+                extents[-1][0] = max(extents[-1][0], x + w)
+                extents[-1][1] = max(extents[-1][1], y + h)
+                x += w + pad
+                shelf = max(shelf, h)
+            area = sum(w * h for w, h in extents)
+            if area < best_area:
+                best, best_area = spots, area
+            if width == limit:
+                break
+        return best
+
+    def clear(self) -> None:
+        """Forget the loaded index and pages (re-read on next lookup)."""
+        self._index = None
+        self._pages.clear()
+        self._converted.clear()
+
+    def _ensure_index(self) -> dict[str, list[int]]:
+        if self._index is None:
+            if self.index_path.is_file():
+                data = json.loads(self.index_path.read_text())
+                self._page_files = data["pages"]
+                mtimes = data.get("mtimes", {})
+                # Frames edited (or removed) since packing load from their files.
+                self._index = {
+                    key: entry
+                    for key, entry in data["frames"].items()
+                    if self._mtime(key) == mtimes.get(key)
+                }
+            else:
+                self._index = {}
+        return self._index
+
+    def _mtime(self, key: str) -> int | None:
+        try:
+            return (self.root / key).stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def page(self, i: int) -> pygame.Surface:
+        surface = self._pages.get(i)
+        if surface is None:
+            surface = self._pages[i] = load_image_compat(self.root / self._page_files[i])
+        if i not in self._converted and pygame.display.get_surface():
+            surface = self._pages[i] = surface.convert_alpha()
+            self._converted.add(i)
+        return surface
+
+    def decode_page(self, i: int) -> None:
+        """Load page ``i`` without converting it (safe off the main thread)."""
+        if i not in self._pages:
+            self._pages[i] = load_image_compat(self.root / self._page_files[i])
+
+    def _entry(self, path) -> list[int] | None:
+        if not self.enabled:
+            return None
+        try:
+            key = Path(path).relative_to(self.root).as_posix()
+        except ValueError:
+            return None
+        return self._ensure_index().get(key)
+
+    def page_index(self, path) -> int | None:
+        """Page holding frame ``path``, or None if it is not packed."""
+        entry = self._entry(path)
+        return None if entry is None else entry[0]
+
+    def frame(self, path) -> pygame.Surface | None:
+        """Subsurface holding frame ``path``, or None if it is not packed."""
+        entry = self._entry(path)
+        if entry is None:
+            return None
+        page, x, y, w, h = entry
+        return self.page(page).subsurface((x, y, w, h))
+
+
+ATLAS = TextureAtlas()
+
+
+# Frames decoded ahead of time by a Preloader, by path, until it finishes.
+_DECODED: dict[Path, pygame.Surface] = {}
+
+
+def load_frame(path) -> pygame.Surface:
+    """Frame ``path`` from the texture atlas, the preloader or its file."""
+    image = ATLAS.frame(path)
+    if image is None:
+        image = _DECODED.get(Path(path))
+    return image if image is not None else load_image_compat(path)
+
+
+class Preloader:
+    """Decodes the frames a level will draw on a worker thread.
+
+    ``requirements`` lists ``(source, (width, height), frame numbers)``. The
+    thread only decodes files (or atlas pages); ``pump`` then converts and
+    scales the decoded frames into ``FRAMES`` on the main thread, through
+    the normal ``get_image_n`` path, within a time budget per call.
+    ``progress`` (0..1) and ``finished`` are there for a loading screen.
+    A file the thread fails to decode is reported by ``pump``, which
+    re-raises the thread's exception on the main thread. ``close`` (also
+    called on finishing or failing) drops the preloader's frames from
+    ``_DECODED`` and stops the thread early.
+    """
+
+    def __init__(self, requirements):
+        import queue
+        import threading
+
+        self._jobs: deque[tuple[Path, tuple[int, int], int]] = deque()
+        paths = []
+        for source, size, ns in requirements:
+            source = Path(source)
+            frames = CATALOGUE.frames(source)
+            # Frame 0 first: it sets the scale of every frame of the source.
+            for n in sorted({0, *ns} & set(range(len(frames)))):
+                self._jobs.append((source, size, n))
+                paths.append(frames[n])
+        self._paths = list(dict.fromkeys(paths))
+        self.total = len(self._jobs)
+        self.done = 0
+        self._ready: set[Path] = set()
+        self._decoded: queue.SimpleQueue = queue.SimpleQueue()
+        self._sprites: dict[tuple, General] = {}
+        self._closed = False
+        self._thread = threading.Thread(target=self._decode, name="preloader", daemon=True)
+
+    def start(self) -> "Preloader":
+        self._thread.start()
+        return self
+
+    def _decode(self) -> None:
+        for path in self._paths:
+            if self._closed:
+                break
+            try:
+                page = ATLAS.page_index(path)
+                if page is not None:
+                    ATLAS.decode_page(page)
+                    self._decoded.put((path, None))
+                else:
+                    self._decoded.put((path, load_image_compat(path)))
+            except Exception as exc:  # handed to the main thread by pump
+                self._decoded.put((path, exc))
+
+    @property
+    def progress(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def finished(self) -> bool:
+        return self.done == self.total
+
+    def pump(self, budget: float = 0.004) -> bool:
+        """Warm ``FRAMES`` with decoded frames for up to ``budget`` seconds.
+
+        Returns ``finished``. Raises what the thread raised decoding a
+        frame, or RuntimeError if the thread died with frames outstanding.
+        """
+        deadline = time.perf_counter() + budget
+        while not self._decoded.empty():
+            path, image = self._decoded.get()
+            if isinstance(image, Exception):
+                self.close()
+                raise RuntimeError(f"preloading {path} failed") from image
+            if image is not None:
+                _DECODED[path] = image
+            self._ready.add(path)
+        while self._jobs and time.perf_counter() < deadline:
+            source, size, n = self._jobs[0]
+            frames = CATALOGUE.frames(source)
+            if frames[n] not in self._ready or frames[0] not in self._ready:
+                # The worker has not got this far yet, or never will.
+                started = self._thread.ident is not None
+                if started and not self._thread.is_alive() and self._decoded.empty():
+                    self.close()
+                    raise RuntimeError(f"preloader stopped before {frames[n]}")
+                break
+            sprite = self._sprites.get((source, size))
+            if sprite is None:
+                sprite = self._sprites[source, size] = General(
+                    source=source, width=size[0], height=size[1]
+                )
+            sprite.get_image_n(n)
+            self._jobs.popleft()
+            self.done += 1
+        if self.finished:
+            self.close()
+        return self.finished
+
+    def close(self) -> None:
+        """Stop decoding and forget the frames decoded so far."""
+        self._closed = True
+        for path in self._paths:
+            _DECODED.pop(path, None)
+
+    def wait(self) -> None:
+        """Block until every frame is decoded and warmed."""
+        self._thread.join()
+        self.pump(budget=math.inf)
+
+
+
+class RawFrameCache:
+    """On-disk cache of decoded, scaled frames as raw pixels, memory-mapped.
+
+    Frames are appended to one data file and listed in a JSON index under a
+    key built from the content hashes of the source files and the target
+    size, so editing a PNG changes its key and the stale entry is simply no
+    longer used. File hashes are remembered per ``(mtime, size)`` so an
+    unchanged file is only stat'ed, not re-read. ``get`` wraps the mapped
+    bytes with ``pygame.image.frombuffer``: no decode and no copy. The map is
+    copy-on-write, so a stray draw on a cached frame cannot touch the file.
+    Pixels are stored in the byte order of the surface handed to ``put``,
+    which in a game is the display's (``convert_alpha``), so a frame read
+    back under the same display needs no conversion either; ``is_display_format``
+    tells whether it does.
+
+    Appends and index writes take a lock file, and ``flush`` merges its new
+    entries into the index on disk, so several processes can share a cache.
+    New entries are indexed on ``flush``, which runs at exit. Disabled by
+    default; ``--frame-cache`` turns it on. Entries are never removed, so
+    frames of edited sources stay in the data file: ``clear`` is the only
+    way to reclaim that space.
+    """
+
+    DATA = "frames.bin"
+    INDEX = "frames.json"
+    LOCK = "frames.lock"
+
+    def __init__(self, directory="assets/.cache", enabled=False):
+        self.directory = Path(directory)
+        self.enabled = enabled
+        self._sources: dict[str, list] | None = None
+        self._frames: dict[str, list] = {}
+        self._added: dict[str, list] = {}  # entries not yet in the index file
+        self._dirty = False
+        # mmap.mmap views, never closed: cached surfaces point into them.
+        self._maps: list = []
+
+    def _read_index(self) -> dict:
+        index = self.directory / self.INDEX
+        return json.loads(index.read_text()) if index.is_file() else {}
+
+    def _ensure_index(self) -> None:
+        if self._sources is not None:
+            return
+        data = self._read_index()
+        self._sources = data.get("sources", {})
+        self._frames = data.get("frames", {})
+
+    @contextmanager
+    def _locked(self):
+        """Hold the cache's lock file (exclusive, across processes)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with (self.directory / self.LOCK).open("a+b") as fh:
+            if os.name == "nt":
+                import msvcrt
+
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    fh.seek(0)
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    @staticmethod
+    def buffer_format(surface: pygame.Surface) -> str:
+        """``frombuffer`` format string matching ``surface``'s pixel layout, if any."""
+        if not surface.get_flags() & pygame.SRCALPHA:
+            return "RGB"
+        if surface.get_bytesize() == 4:
+            shifts = [mask.bit_length() for mask in surface.get_masks()]
+            order = sorted("RGBA", key=lambda channel: shifts["RGBA".index(channel)])
+            if sys.byteorder == "big":
+                order.reverse()
+            fmt = "".join(order)
+            if fmt in ("RGBA", "BGRA", "ARGB"):
+                return fmt
+        return "RGBA"
+
+    @staticmethod
+    def is_display_format(surface: pygame.Surface) -> bool:
+        """True if ``surface`` already has the layout ``convert_alpha`` would give it."""
+        converted = pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha()
+        return surface.get_masks() == converted.get_masks()
+
+    def source_hash(self, path) -> str:
+        """Content hash of ``path``, recomputed only when its stat changes."""
+        self._ensure_index()
+        stat = os.stat(path)
+        name = Path(path).as_posix()
+        known = self._sources.get(name)
+        if known and known[:2] == [stat.st_mtime_ns, stat.st_size]:
+            return known[2]
+        import hashlib
+
+        digest = hashlib.blake2b(Path(path).read_bytes(), digest_size=16).hexdigest()
+        self._sources[name] = [stat.st_mtime_ns, stat.st_size, digest]
+        return digest
+
+    def key(self, paths, size) -> str:
+        """Cache key for the frame built from ``paths`` to fit ``size``."""
+        hashes = "+".join(self.source_hash(path) for path in paths)
+        return f"{hashes}@{size[0]}x{size[1]}"
+
+    def _view(self, offset: int, length: int) -> memoryview | None:
+        if not self._maps or offset + length > len(self._maps[-1]):
+            data = self.directory / self.DATA
+            if not data.is_file() or data.stat().st_size < offset + length:
+                return None
+            import mmap
+
+            with data.open("rb") as fh:
+                self._maps.append(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_COPY))
+        return memoryview(self._maps[-1])[offset : offset + length]
+
+    def get(self, key) -> pygame.Surface | None:
+        self._ensure_index()
+        entry = self._frames.get(key)
+        if entry is None:
+            return None
+        offset, w, h, fmt = entry
+        view = self._view(offset, w * h * len(fmt))
+        return None if view is None else pygame.image.frombuffer(view, (w, h), fmt)
+
+    def put(self, key, surface: pygame.Surface) -> None:
+        """Append ``surface``'s pixels, in its own byte order, under ``key``."""
+        self._ensure_index()
+        fmt = self.buffer_format(surface)
+        pixels = pygame.image.tobytes(surface, fmt)
+        with self._locked(), (self.directory / self.DATA).open("ab") as fh:
+            offset = fh.seek(0, os.SEEK_END)
+            fh.write(pixels)
+        self._frames[key] = self._added[key] = [offset, *surface.get_size(), fmt]
+        if not self._dirty:
+            self._dirty = True
+            atexit.register(self.flush)
+
+    def flush(self) -> None:
+        """Merge the frames added since the last flush into the index file."""
+        if not self._dirty:
+            return
+        index = self.directory / self.INDEX
+        with self._locked():
+            # Another process may have indexed frames since we read the file.
+            data = self._read_index()
+            sources = data.get("sources", {}) | self._sources
+            frames = data.get("frames", {}) | self._added
+            tmp = index.with_name(f".{index.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"sources": sources, "frames": frames}))
+            os.replace(tmp, index)
+        self._sources, self._frames = sources, frames | self._frames
+        self._added = {}
+        self._dirty = False
+        atexit.unregister(self.flush)
+
+    def clear(self) -> None:
+        for name in (self.DATA, self.INDEX):
+            (self.directory / name).unlink(missing_ok=True)
+        self._sources, self._frames, self._added = {}, {}, {}
+        self._dirty = False
+        atexit.unregister(self.flush)
+
+
+RAW_FRAMES = RawFrameCache()
 
 
 def get_path():
@@ -50,6 +857,150 @@ def get_path():
         yield point
 
 
+# Enemy routes (waypoint generators) by name, for snapshots.
+ROUTES = {"get_path": get_path}
+
+
+class Route:
+    """A waypoint polyline parameterised by arc length.
+
+    ``cumulative[i]`` is the distance from the start to waypoint ``i``, so the
+    point at any distance along the route is a binary search plus a linear
+    interpolation (``np.interp`` does both, for a whole array of distances).
+    """
+
+    def __init__(self, points):
+        self.points = np.array(list(points), dtype=float).reshape(-1, 2)
+        segments = np.diff(self.points, axis=0)
+        lengths = np.hypot(segments[:, 0], segments[:, 1])
+        self.cumulative = np.concatenate([[0.0], np.cumsum(lengths)])
+        self.length = float(self.cumulative[-1])
+
+    def __len__(self):
+        return len(self.points)
+
+    def positions(self, distances) -> np.ndarray:
+        """``(n, 2)`` points at ``distances`` along the route, clamped to its ends."""
+        distances = np.asarray(distances, dtype=float)
+        xs = np.interp(distances, self.cumulative, self.points[:, 0])
+        ys = np.interp(distances, self.cumulative, self.points[:, 1])
+        return np.stack([xs, ys], axis=-1)
+
+    def position(self, distance: float) -> tuple[float, float]:
+        x, y = self.positions([distance])[0]
+        return float(x), float(y)
+
+
+class EnemyStore:
+    """Struct-of-arrays movement and HP state for every enemy on the field.
+
+    Row ``i`` of each array belongs to ``sprites[i]``; removal swaps the last
+    row into the hole so the live rows stay contiguous. An enemy's movement
+    state is one scalar, ``progress``: the distance walked along its Route.
+    ``step`` advances every enemy with a handful of array operations, then
+    writes the integer positions back into the sprites' rects, which are only
+    used for drawing, targeting and hit tests.
+
+    The route passes through each enemy's anchor point: rect centre-x, rect
+    bottom + a lane offset.
+    """
+
+    COLUMNS = ("progress", "speed", "hp", "anchor", "route_id")
+
+    def __init__(self, capacity=64):
+        self.n = 0
+        self.sprites: list = []
+        self.routes: list[Route] = []
+        self._route_ids: dict = {}  # route factory -> index in ``routes``
+        self._allocate(capacity)
+
+    def __len__(self):
+        return self.n
+
+    def _allocate(self, capacity):
+        old = {name: getattr(self, name, None) for name in self.COLUMNS}
+        self.capacity = capacity
+        self.progress = np.zeros(capacity)  # px walked along the route
+        self.speed = np.zeros(capacity)  # px / sec
+        self.hp = np.zeros(capacity, dtype=np.int64)
+        self.anchor = np.zeros((capacity, 2))  # anchor point relative to top-left
+        self.route_id = np.zeros(capacity, dtype=np.int64)
+        for name, values in old.items():
+            if values is not None:
+                getattr(self, name)[: self.n] = values[: self.n]
+
+    def route(self, factory) -> int:
+        """Index of the Route built from waypoint generator ``factory``."""
+        route_id = self._route_ids.get(factory)
+        if route_id is None:
+            route_id = self._route_ids[factory] = len(self.routes)
+            self.routes.append(Route(factory()))
+        return route_id
+
+    def add(self, sprite) -> None:
+        if self.n == self.capacity:
+            self._allocate(self.capacity * 2)
+        i = self.n
+        self.progress[i] = sprite.progress
+        self.speed[i] = sprite.speed
+        self.hp[i] = sprite.hp
+        self.anchor[i] = (sprite.rect.width // 2, sprite.rect.height + sprite.lane)
+        self.route_id[i] = self.route(sprite.route)
+        self.sprites.append(sprite)
+        self.n += 1
+        sprite._store, sprite._slot = self, i
+        self._sync_rects(slice(i, i + 1))
+
+    def remove(self, sprite) -> None:
+        i, last = sprite._slot, self.n - 1
+        # Hand the final values back so the dead sprite stays readable.
+        sprite._store, sprite._slot = None, None
+        sprite.hp = int(self.hp[i])
+        sprite.speed = float(self.speed[i])
+        sprite.progress = float(self.progress[i])
+        if i != last:
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                column[i] = column[last]
+            moved = self.sprites[last]
+            self.sprites[i] = moved
+            moved._slot = i
+        self.sprites.pop()
+        self.n -= 1
+
+    def positions(self, rows=slice(None)) -> np.ndarray:
+        """Anchor points (on the route) of the enemies in ``rows``."""
+        progress = self.progress[: self.n][rows]
+        route_id = self.route_id[: self.n][rows]
+        if len(self.routes) == 1:
+            return self.routes[0].positions(progress)
+        points = np.empty((len(progress), 2))
+        for rid, route in enumerate(self.routes):
+            mask = route_id == rid
+            points[mask] = route.positions(progress[mask])
+        return points
+
+    def _sync_rects(self, rows=slice(None)) -> None:
+        topleft = np.floor(self.positions(rows) - self.anchor[: self.n][rows])
+        for sprite, (x, y) in zip(self.sprites[rows], topleft.astype(np.int64).tolist()):
+            rect = sprite._rect
+            rect.x = x
+            rect.y = y
+
+    def step(self, dt: float) -> list:
+        """Advance every enemy by ``dt`` seconds. Returns the sprites that
+        reached the end of their route."""
+        n = self.n
+        if n == 0:
+            return []
+        progress = self.progress[:n]
+        progress += self.speed[:n] * dt
+        ends = np.array([route.length for route in self.routes])
+        self._sync_rects()
+        done = progress >= ends[self.route_id[:n]]
+        return [self.sprites[i] for i in np.flatnonzero(done)]
+
+
 class General(pygame.sprite.Sprite):
     # Default render layer; subclasses override (enemies=10, towers=20, effects=30, UI=40).
     _layer = 0
@@ -70,7 +1021,6 @@ class General(pygame.sprite.Sprite):
 
         self.counter = 0
         self.Dt = deque(maxlen=60)
-        self.Pt = deque(maxlen=60)
 
     def __repr__(self):
         return super().__repr__() + f' ("{self.source}")'
@@ -78,8 +1028,7 @@ class General(pygame.sprite.Sprite):
     @property
     def frame_path(self):
         if self.source:
-            frame_path = self.source.rglob("*_[0-9][0-9].png")
-            return sorted(frame_path)
+            return CATALOGUE.frames(self.source)
 
     @property
     def fps(self):
@@ -97,42 +1046,67 @@ class General(pygame.sprite.Sprite):
         ) ** 0.5
 
     def get_image_n(self, n):
-        cache = self.__dict__.setdefault("_image_cache", {})
-        if n not in cache:
-            image = load_image_compat(self.frame_path[n])
-            if "level" not in self.source.as_posix():  # FIXME
+        key = (self.source, n, (self.width, self.height))
+        return FRAMES.get(key, lambda: self._load_frame(n))
+
+    def _load_frame(self, n):
+        if RAW_FRAMES.enabled:
+            paths = (self.frame_path[n], self.frame_path[0])
+            key = RAW_FRAMES.key(paths, (self.width, self.height))
+            image = RAW_FRAMES.get(key)
+            if image is None:
+                image = self._decode_frame(n)
+                RAW_FRAMES.put(key, image)
+            elif (
+                image.get_flags() & pygame.SRCALPHA
+                and pygame.display.get_surface()
+                and not RAW_FRAMES.is_display_format(image)
+            ):
+                # Cached without a display (or under another one): copy into
+                # the display format like a freshly decoded frame.
                 image = image.convert_alpha()
-            width, height = image.get_width(), image.get_height()
-            self.scale = (
-                min(self.width / width, self.height / height)
-                if self.scale is None
-                else self.scale
-            )
-            img = pygame.transform.scale(
-                image,
-                (
-                    int(image.get_width() * self.scale),
-                    int(image.get_height() * self.scale),
-                ),
+            return image
+        return self._decode_frame(n)
+
+    def _decode_frame(self, n):
+        image = load_frame(self.frame_path[n])
+        # convert_alpha needs a display mode; headless simulations skip it.
+        # Atlas frames come from an already converted page.
+        if (
+            image.get_parent() is None
+            and "level" not in self.source.as_posix()
+            and pygame.display.get_surface()
+        ):  # FIXME
+            image = image.convert_alpha()
+        if self.scale is None:
+            # Every frame of a source is scaled by the factor that fits frame 0
+            # into (width, height), so an animation keeps a constant size.
+            first = image if n == 0 else load_frame(self.frame_path[0])
+            self.scale = min(
+                self.width / first.get_width(), self.height / first.get_height()
             )
-            cache[n] = img
-        return cache[n]
+        return pygame.transform.scale(
+            image,
+            (
+                int(image.get_width() * self.scale),
+                int(image.get_height() * self.scale),
+            ),
+        )
 
     @property
     def rect(self):
         return self._rect
 
     def update(self, *args: Any, **kwargs: Any) -> None:
+        # Counts calls, i.e. simulation ticks for world sprites and rendered
+        # frames for UI sprites. Gameplay never reads the wall clock here.
         super().update(*args, **kwargs)
         self.counter += 1
-        self.time = time.time() - self.time0
-        self.Dt.append(self.time)
-        self.Pt.append(self.rect.center)
 
     @property
     def n_frames(self):
         # two digits combined with '*.png'
-        return len(self.frame_path)
+        return CATALOGUE.count(self.source) if self.source else 0
 
 
 class GameStats(General):
@@ -148,11 +1122,14 @@ class GameStats(General):
         super().__init__(*args, **kwargs)
         # self.image = pygame.Surface((width, height), pygame.SRCALPHA)
         self.game = self.parent
-        self.rect.x = self.parent.screen.get_width() - self.rect.width - 10
+        self.sim = self.game.sim
+        self.rect.x = self.game.screen.get_width() - self.rect.width - 10
         self.rect.y = 10
         self.log = deque(maxlen=6)
 
     def get_image_n(self, n):
+        # Per-instance canvas redrawn every frame, so it must not be shared
+        # through FRAMES.
         cache = self.__dict__.setdefault("_image_cache", {})
         if n not in cache:
             cache[n] = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
@@ -165,17 +1142,24 @@ class GameStats(General):
             for n in range(4)
         ]
 
-    @property
-    def life(self):
-        hearts = [self.pngs[3]] * (self.game.health // 3)
-        hearts += [self.pngs[self.game.health % 3]] if self.game.health % 3 else []
-        hearts += [self.pngs[0]] * (10 - len(hearts))
+    @cached_property
+    def hearts(self):
+        """Heart icons (empty, 1/3, 2/3, full) pre-scaled once for the HUD."""
+        scale = 0.2
+        return [
+            pygame.transform.scale(
+                png, (int(png.get_width() * scale), int(png.get_height() * scale))
+            )
+            for png in self.pngs
+        ]
+
+    def draw_life(self, health):
+        health = max(0, health)
+        hearts = [self.hearts[3]] * (health // 3)
+        hearts += [self.hearts[health % 3]] if health % 3 else []
+        hearts += [self.hearts[0]] * (10 - len(hearts))
 
         for x, heart in zip(range(11, 0, -1), hearts):
-            scale = 0.2
-            heart = pygame.transform.scale(
-                heart, (int(heart.get_width() * scale), int(heart.get_height() * scale))
-            )
             self.image.blit(heart, (x * heart.get_width(), 0))
 
     @cached_property
@@ -188,33 +1172,39 @@ class GameStats(General):
 
     def update(self, *args, **kwargs):
         super().update(*args, **kwargs)
-        self.image.fill((0, 0, 0, 0))
-        stats = (
-            [self.Font.render(f"Money: {self.game.money}", True, (219, 172, 52))]
-            + [
-                self.Font.render(
-                    f"Wave: {self.game.wave_number} / {self.game.WAVE_COUNT}",
-                    True,
-                    (255, 220, 120),
-                )
-            ]
-            + [self.font.render(f"Time: {self.game.time:.2f}", True, (255, 255, 255))]
-            + [
-                self.font.render(
-                    f"FPS: {self.game.fps}/{self.game.FPS}", True, (255, 255, 255)
-                )
-            ]
-        )
-        texts = stats + [
-            self.font.render(f"{log}", True, (255, 255, 255)) for log in self.log
-        ]
+        white = (255, 255, 255)
+        # Clock and frame rate change every frame; show them at one update
+        # per second so they don't force a recomposite on every frame.
+        second = int(self.game.time)
+        if second != getattr(self, "_second", None):
+            self._second = second
+            self._fps = self.game.fps
+        speed = "max" if not self.game.speed else f"{self.game.speed}x"
+        lines = [
+            (self.Font, f"Money: {self.sim.money}", (219, 172, 52)),
+            (
+                self.Font,
+                f"Wave: {self.sim.wave_label(' / ')}",
+                (255, 220, 120),
+            ),
+            (self.font, f"Time: {int(self.sim.time)}s", white),
+            (self.font, f"FPS: {self._fps}/{self.game.FPS}", white),
+            (self.font, f"Speed: {speed}", white),
+        ] + [(self.font, f"{log}", white) for log in self.log]
+        # Only recomposite when something visible changed.
+        inputs = (lines, self.sim.health)
+        if inputs == getattr(self, "_inputs", None):
+            return
+        self._inputs = inputs
 
-        for i, text in enumerate(texts):
+        self.image.fill((0, 0, 0, 0))
+        for i, (font, line, color) in enumerate(lines):
+            text = render_text(font, line, color)
             text_rect = text.get_rect()
             text_rect.x = self.image.get_width() - text_rect.width
             text_rect.y += self.FONTSIZE * i
             self.image.blit(text, text_rect)
-        self.life
+        self.draw_life(self.sim.health)
 
 
 class Character(General):
@@ -228,6 +1218,10 @@ class Character(General):
     # spawned a fire Effect. Class-level default keeps hand-built / __new__'d
     # instances safe without a custom __init__.
     _on_fire: bool = False
+    # EnemyStore row holding this character's movement and HP while it is
+    # on the field; None for followers, decorations and dead enemies.
+    _store: EnemyStore | None = None
+    _slot: int | None = None
 
     def __init__(self, *args, route=get_path, speed=45, left=True, **kwargs):
         if "pos" in kwargs:
@@ -236,14 +1230,62 @@ class Character(General):
         if hasattr(self, "pos"):
             self.rect.x, self.rect.y = self.pos
         self.speed = speed
-        self.move_offset = [0, 0]
-        self.route = route()
+        self.progress = 0.0  # distance walked along the route
+        self.route = route
         self.left = left
 
-        self.destination = next(self.route)
         self.max_hp = self.MAX_HP if self.MAX_HP is not None else 0
         self.hp = self.max_hp
 
+    @property
+    def lane(self) -> int:
+        """Vertical offset of the walking anchor from the rect bottom."""
+        return -66 if self.left else 22
+
+    @property
+    def hp(self) -> int:
+        if self._store is None:
+            return self._hp
+        return int(self._store.hp[self._slot])
+
+    @hp.setter
+    def hp(self, value: int) -> None:
+        if self._store is None:
+            self._hp = value
+        else:
+            self._store.hp[self._slot] = value
+
+    @property
+    def speed(self) -> float:
+        if self._store is None:
+            return self._speed
+        return float(self._store.speed[self._slot])
+
+    @speed.setter
+    def speed(self, value: float) -> None:
+        if self._store is None:
+            self._speed = value
+        else:
+            self._store.speed[self._slot] = value
+
+    @property
+    def progress(self) -> float:
+        if self._store is None:
+            return self._progress
+        return float(self._store.progress[self._slot])
+
+    @progress.setter
+    def progress(self, value: float) -> None:
+        if self._store is None:
+            self._progress = value
+        else:
+            self._store.progress[self._slot] = value
+
+    def kill(self) -> None:
+        if self._store is not None:
+            self._store.remove(self)
+        super().kill()
+
     def take_damage(self, amount: int) -> None:
         """Reduce hp by ``amount``; on death, award gold and remove the sprite.
 
@@ -273,36 +1315,6 @@ class Character(General):
         self.rect.x += dx
         self.rect.y += dy
 
-    def navigate(self):
-        # Removed dead debug hook (was: per-instance position print gated by id(self)).
-        left = -66 if self.left else 22
-        direction_vector = np.array(self.destination) - np.array(
-            [self.rect.center[0], self.rect.bottom + left]
-        )
-        vector_length = (direction_vector[0] ** 2 + direction_vector[1] ** 2) ** 0.5
-        if vector_length == 0:
-            norm = [0, 0]
-        else:
-            norm = direction_vector / vector_length
-        if vector_length <= self.speed:
-            try:
-                self.destination = next(self.route)
-            except StopIteration:
-                self.kill()
-                self.parent.stats.log.append(
-                    f"enemy reached goal at {self.rect.center}"
-                )
-                self.parent.health -= 1
-                if self.parent.health <= 0:
-                    self.parent.stats.log.append("game over")
-                return
-        move_x = self.speed / self.fps * norm[0] + self.move_offset[0]
-        self.move_offset[0] = move_x - int(move_x)
-        move_y = self.speed / self.fps * norm[1] + self.move_offset[1]
-        self.move_offset[1] = move_y - int(move_y)
-        self.rect.x += int(move_x)
-        self.rect.y += int(move_y)
-
     def put_on_fire(self):
         fire = Effect(
             width=80,
@@ -337,6 +1349,10 @@ class Effect(Character):
             self.kill()
             return
         super().update(*args, **kwargs)
+        self._place()
+
+    def _place(self) -> None:
+        """Pick the frame for ``counter`` and sit on top of ``follow``."""
         # Cycle through frames at ~12 fps regardless of game FPS.
         ticks_per_frame = max(1, self.parent.FPS // 12)
         n_frame = (self.counter // ticks_per_frame) % self.n_frames
@@ -366,16 +1382,19 @@ class Golem(Character):
     MAX_HP = 100
     GOLD_REWARD = 25
 
-    # animate sprite
+    _walk_frame: int | None = None
+
+    # animate sprite. Movement happens in bulk in Simulation.enemies, so this
+    # only has to pick the walk-cycle frame.
     def update(self, *args: Any, **kwargs: Any) -> None:
         super().update(*args, **kwargs)
         # cycle sprite images
         n_frame = self.WALK[
             self.counter // (max(1, self.parent.FPS // 8)) % len(self.WALK)
         ]
-        self.image = self.get_image_n(n_frame)
-
-        self.navigate()
+        if n_frame != self._walk_frame:
+            self._walk_frame = n_frame
+            self.image = self.get_image_n(n_frame)
 
 
 class Viking(Golem):
@@ -385,6 +1404,10 @@ class Viking(Golem):
     GOLD_REWARD = 10
 
 
+# Enemy classes by name, for data that names them (snapshots, wave files).
+ENEMY_TYPES = {cls.__name__: cls for cls in (Golem, Viking)}
+
+
 def closest_enemy(pos, enemies, max_range):
     """Return the enemy in ``enemies`` closest to ``pos`` within ``max_range``, or None.
 
@@ -403,11 +1426,50 @@ def closest_enemy(pos, enemies, max_range):
     return best
 
 
+class SpatialHash:
+    """Uniform grid bucketing points into ``cell_size`` square cells.
+
+    Rebuilt from scratch once per tick (``clear`` + ``insert``) rather than
+    updated incrementally: every enemy moves every tick anyway. Queries return
+    candidates only; callers do the exact distance / collision test.
+    """
+
+    def __init__(self, cell_size=80):
+        self.cell_size = cell_size
+        self._cells: dict[tuple[int, int], list] = {}
+
+    def clear(self) -> None:
+        self._cells = {}
+
+    def insert(self, item, x, y) -> None:
+        size = self.cell_size
+        key = (x // size, y // size)
+        bucket = self._cells.get(key)
+        if bucket is None:
+            self._cells[key] = [item]
+        else:
+            bucket.append(item)
+
+    def query(self, left, top, right, bottom):
+        """Candidates in every cell the box touches."""
+        size = self.cell_size
+        cells = self._cells
+        for cx in range(int(left) // size, int(right) // size + 1):
+            for cy in range(int(top) // size, int(bottom) // size + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    yield from bucket
+
+    def within(self, pos, radius):
+        x, y = pos
+        return self.query(x - radius, y - radius, x + radius, y + radius)
+
+
 def _make_arrow_surface() -> pygame.Surface:
     """Build a horizontal arrow sprite once. Tip points to +x.
 
     Brown wooden shaft, grey triangular tip. Module-level so we don't rebuild
-    it per arrow instance — rotation reuses this baked surface.
+    it per arrow instance — the rotation atlas is baked from this surface.
     """
     width, height = 28, 8
     surf = pygame.Surface((width, height), pygame.SRCALPHA)
@@ -433,6 +1495,81 @@ def _arrow_surface() -> pygame.Surface:
     return _ARROW_SURFACE
 
 
+_BULLET_SURFACE: pygame.Surface | None = None
+
+
+def _bullet_surface() -> pygame.Surface:
+    """Shared 4 px white dot for bullets without their own visuals."""
+    global _BULLET_SURFACE
+    if _BULLET_SURFACE is None:
+        _BULLET_SURFACE = pygame.Surface((4, 4), pygame.SRCALPHA)
+        pygame.draw.circle(_BULLET_SURFACE, (255, 255, 255), (2, 2), 2)
+    return _BULLET_SURFACE
+
+
+class ProjectilePool:
+    """Free lists of spent projectiles, one per class, recycled by ``acquire``.
+
+    A killed bullet is parked here (up to ``cap`` per class) instead of being
+    dropped, and the next shot of that class re-initialises it with
+    ``Bullet.reset`` rather than allocating a new sprite.
+    """
+
+    def __init__(self, cap: int = 256):
+        self.cap = cap
+        self.created = 0
+        self.reused = 0
+        self._free: dict[type, list] = {}
+
+    def acquire(self, cls, **kwargs):
+        free = self._free.get(cls)
+        if free:
+            bullet = free.pop()
+            bullet.reset(**kwargs)
+            self.reused += 1
+        else:
+            bullet = cls(**kwargs)
+            self.created += 1
+        return bullet
+
+    def release(self, bullet) -> None:
+        free = self._free.setdefault(type(bullet), [])
+        if len(free) < self.cap:
+            bullet.target = None  # don't keep dead enemies alive
+            free.append(bullet)
+
+
+class RotationAtlas:
+    """A sprite pre-rotated at ``steps`` evenly spaced headings.
+
+    Rotating per projectile per frame is expensive; picking the nearest of a
+    few dozen baked rotations is a list index. Atlases are shared: ``shared``
+    builds one per (sprite factory, steps) the first time it is asked for.
+    """
+
+    _shared: dict = {}
+
+    def __init__(self, surface: pygame.Surface, steps: int = 64):
+        self.steps = steps
+        # Frame i faces heading i * 360 / steps degrees (screen coords, +y
+        # down); pygame rotates counter-clockwise, hence the minus sign.
+        self.frames = [
+            pygame.transform.rotate(surface, -i * 360 / steps) for i in range(steps)
+        ]
+
+    @classmethod
+    def shared(cls, factory, steps: int = 64) -> "RotationAtlas":
+        atlas = cls._shared.get((factory, steps))
+        if atlas is None:
+            atlas = cls._shared[(factory, steps)] = cls(factory(), steps)
+        return atlas
+
+    def frame(self, dx: float, dy: float) -> pygame.Surface:
+        """The baked rotation closest to direction ``(dx, dy)``."""
+        heading = math.degrees(math.atan2(dy, dx))
+        return self.frames[round(heading * self.steps / 360) % self.steps]
+
+
 class Bullet(pygame.sprite.Sprite):
     """Ballistic projectile base. Subclasses provide visuals via ``self.image``.
 
@@ -456,22 +1593,39 @@ class Bullet(pygame.sprite.Sprite):
     # towers are tall and enemies are close, so we just want a gentle dip.
     drag: float = 0.4  # fraction of speed lost per second
     launch_elevation: float = 0.0  # archer is already elevated; aim straight
+    # Opt-in rotating visuals: a zero-argument factory for the sprite pointing
+    # to +x, pre-rotated into a shared RotationAtlas of rotation_steps angles.
+    rotation_sprite = None
+    rotation_steps: int = 64
 
-    def __init__(self, *, pos, target, parent, direction=None):
+    def __init__(self, *, pos, target, parent, direction=None, damage=None):
         super().__init__()
+        self._hit: set[int] = set()  # ids of enemies already damaged (for pierce)
+        self.reset(
+            pos=pos, target=target, parent=parent, direction=direction, damage=damage
+        )
+
+    def reset(self, *, pos, target, parent, direction=None, damage=None) -> None:
+        """(Re)arm the bullet for a new shot; used by ProjectilePool on reuse."""
         self.parent = parent
         self.target = target
+        self.damage = type(self).damage if damage is None else damage
         self.pos = [float(pos[0]), float(pos[1])]
         self._hits_left = self.max_hits
-        self._hit: set[int] = set()  # ids of enemies already damaged (for pierce)
-        self._last_update = time.time()
+        self._hit.clear()
         # Velocity replaces the old "direction + speed" pair so we can apply
         # gravity and drag to it independently each frame.
         self._velocity = self._initial_velocity(direction)
-        self.image = pygame.Surface((4, 4), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, (255, 255, 255), (2, 2), 2)
+        self.image = _bullet_surface()
         self.rect = self.image.get_rect(center=(int(self.pos[0]), int(self.pos[1])))
 
+    def kill(self) -> None:
+        was_alive = self.alive()
+        super().kill()
+        pool = getattr(self.parent, "bullet_pool", None)
+        if was_alive and pool is not None:
+            pool.release(self)
+
     # --- direction / movement -------------------------------------------------
 
     def _initial_velocity(self, direction):
@@ -515,9 +1669,7 @@ class Bullet(pygame.sprite.Sprite):
     # --- main loop ------------------------------------------------------------
 
     def update(self, *_args, **_kwargs) -> None:
-        now = time.time()
-        dt = now - self._last_update
-        self._last_update = now
+        dt = self.parent.DT
 
         # Drag: scale velocity down by a fraction proportional to dt.
         # (1 - drag * dt) is a simple linear approximation; clamp at 0 to be safe.
@@ -539,20 +1691,20 @@ class Bullet(pygame.sprite.Sprite):
         self._check_hits()
 
     def _out_of_bounds(self) -> bool:
-        screen = self.parent.screen
         x, y = self.pos
         return (
             x < -50
             or y < -50
-            or x > screen.get_width() + 50
-            or y > screen.get_height() + 50
+            or x > self.parent.width + 50
+            or y > self.parent.height + 50
         )
 
     def _check_hits(self) -> None:
-        for enemy in list(self.parent.all_enemies):
+        x, y = int(self.pos[0]), int(self.pos[1])
+        for enemy in self.parent.enemies_at(x, y):
             if id(enemy) in self._hit:
                 continue
-            if not enemy.rect.collidepoint(int(self.pos[0]), int(self.pos[1])):
+            if not enemy.alive() or not enemy.rect.collidepoint(x, y):
                 continue
             self._hit.add(id(enemy))
             self.apply_damage(enemy)
@@ -564,20 +1716,19 @@ class Bullet(pygame.sprite.Sprite):
                 return
 
     def _apply_aoe(self, primary) -> None:
-        cx, cy = primary.rect.center
-        r2 = self.impact_radius * self.impact_radius
-        for enemy in list(self.parent.all_enemies):
+        for enemy in self.parent.enemies_near(primary.rect.center, self.impact_radius):
             if enemy is primary or id(enemy) in self._hit:
                 continue
-            ex, ey = enemy.rect.center
-            if (ex - cx) ** 2 + (ey - cy) ** 2 <= r2:
-                self._hit.add(id(enemy))
-                self.apply_damage(enemy)
+            self._hit.add(id(enemy))
+            self.apply_damage(enemy)
 
     # --- visuals (subclasses override) ---------------------------------------
 
     def _render(self) -> None:
-        """Update ``self.image``. Base draws nothing fancy; Arrow rotates its sprite."""
+        """Update ``self.image``: face the flight direction if ``rotation_sprite`` is set."""
+        if self.rotation_sprite is not None:
+            atlas = RotationAtlas.shared(self.rotation_sprite, self.rotation_steps)
+            self.image = atlas.frame(*self._velocity)
 
 
 class Arrow(Bullet):
@@ -587,19 +1738,15 @@ class Arrow(Bullet):
     speed = 650.0
     damage = 15
     enemy_modifiers = {}  # populated below once Viking/Golem are defined
-
-    def _render(self) -> None:
-        # pygame.transform.rotate uses degrees, CCW positive. Our sprite points
-        # to +x at angle 0, so the rotation angle is -atan2(dy, dx) in degrees.
-        import math
-
-        angle = -math.degrees(math.atan2(self._direction[1], self._direction[0]))
-        self.image = pygame.transform.rotate(_arrow_surface(), angle)
+    rotation_sprite = staticmethod(_arrow_surface)
 
 
 # Per-enemy damage multipliers for arrows. Defined after enemy classes exist.
 Arrow.enemy_modifiers = {Viking: 1.3, Golem: 0.8}
 
+# Projectile classes by name, for snapshots.
+PROJECTILE_TYPES = {cls.__name__: cls for cls in (Bullet, Arrow)}
+
 
 class Tower(General):
     PRICE = 50
@@ -614,12 +1761,17 @@ class Tower(General):
     DAMAGE_BY_RANK = (10, 20, 35)
     COOLDOWN_BY_RANK = (0.8, 0.6, 0.4)  # seconds between shots
     ARCHER_HEIGHT = 160  # px above tower base where arrows spawn
+    # Target choice: "nearest" enemy in range, or "first" = furthest along
+    # the route (closest to the exit).
+    TARGETING = "nearest"
     _layer = 20  # towers above enemies
 
+    SOURCE = "assets/Towers (brown)"
+
     def __init__(
         self,
         *args,
-        source="assets/Towers (brown)",
+        source=SOURCE,
         pos=None,
         color="brown",
         rank=0,
@@ -630,7 +1782,9 @@ class Tower(General):
         self.color = color
         self.rank = rank
         self.pos = pos
-        self._last_fire_time = 0.0
+        self._last_fire_time = float("-inf")
+        self._look = None
+        self.refresh_image()
 
     @property
     def range(self) -> int:
@@ -651,31 +1805,43 @@ class Tower(General):
             return
         self.parent.money -= self.UPGRADE_PRICES[self.rank]
         self.rank += 1
-        self.__dict__.pop("_image_cache", None)
-        self.update()
+        self.refresh_image()
 
     def stack_images(self, ns):
-        imgs = []
-        for n in ns:
-            img = self.get_image_n(n)
-
-            imgs.append(img)
-            max_width = max([img.get_width() for img in imgs])
-        self.image = pygame.Surface(
-            (max_width, sum([img.get_height() for img in imgs])), pygame.SRCALPHA
+        """Composite the layer frames ``ns`` bottom-up into a new surface."""
+        imgs = [self.get_image_n(n) for n in ns]
+        max_width = max(img.get_width() for img in imgs)
+        image = pygame.Surface(
+            (max_width, sum(img.get_height() for img in imgs)), pygame.SRCALPHA
         )
-        y = self.image.get_height() - imgs[0].get_height()
-        for i, img in enumerate(imgs):
-            self.image.blit(img, (0 + (max_width - img.get_width()) / 2, y))
+        y = image.get_height() - imgs[0].get_height()
+        for img in imgs:
+            image.blit(img, (0 + (max_width - img.get_width()) / 2, y))
             y -= img.get_height() - 43
+        return image
 
+    def refresh_image(self):
+        """Re-stack the tower's look if its colour or rank changed.
+
+        Composites are shared through FRAMES by all towers with the same
+        colour, rank and size, so this only blits the first time a look
+        appears. Called on construction and upgrade, never per tick.
+        """
+        look = (self.color, self.rank)
+        if look == self._look:
+            return
+        self._look = look
+        ns = self.TOWERS[self.color][self.rank]
+        key = (self.source, look, (self.width, self.height))
+        self.image = FRAMES.get(key, lambda: self.stack_images(ns))
         self._rect = self.image.get_rect()
-        self.rect.x = self.pos[0] - self.rect.width / 2
-        self.rect.y = self.pos[1] - self.rect.height + imgs[0].get_height() / 2
+        if self.pos is not None:
+            base_height = self.get_image_n(ns[0]).get_height()
+            self.rect.x = self.pos[0] - self.rect.width / 2
+            self.rect.y = self.pos[1] - self.rect.height + base_height / 2
 
     def update(self):
-        tower = self.TOWERS[self.color][self.rank]
-        self.stack_images(tower)
+        # Only firing runs per tick; the look changes via refresh_image.
         self._maybe_fire()
 
     def _maybe_fire(self) -> None:
@@ -684,10 +1850,13 @@ class Tower(General):
             return
         idx = min(self.rank, len(self.COOLDOWN_BY_RANK) - 1)
         cooldown = self.COOLDOWN_BY_RANK[idx]
-        now = time.time()
+        now = self.parent.time
         if now - self._last_fire_time < cooldown:
             return
-        target = closest_enemy(self.pos, self.parent.all_enemies, self.range)
+        if self.TARGETING == "first":
+            target = self.parent.first_enemy(self.pos, self.range)
+        else:
+            target = self.parent.nearest_enemy(self.pos, self.range)
         if target is None:
             return
         # Spawn from where the archer stands. The tower's `pos` is at the
@@ -696,18 +1865,24 @@ class Tower(General):
         # arrows still appear on-screen even when a tall rank-2 sprite extends
         # above the play area.
         spawn = (self.pos[0], self.pos[1] - self.ARCHER_HEIGHT)
-        arrow = Arrow(pos=spawn, target=target, parent=self.parent)
-        arrow.damage = self.DAMAGE_BY_RANK[idx]
-        self.parent.all_sprites.add(arrow)
-        self.parent.all_bullets.add(arrow)
+        self.parent.fire(
+            Arrow, pos=spawn, target=target, damage=self.DAMAGE_BY_RANK[idx]
+        )
         self._last_fire_time = now
 
 
 class Schedule:
-    type = 42000
+    """Deferred spawn, due ``delay`` ms of simulation time after creation.
+
+    Queued in the owning Simulation's ``scheduler``, which calls it once due.
+    """
+
+    cancelled = False
+    queued = False  # waiting in a Scheduler
+    remaining = 1  # spawns still to come from this entry
 
     def __init__(self, func, *args, delay=500, parent=None, **kwargs):
-        self.start_time = time.time()
+        self.start_time = parent.time
         self.delay = delay
         self.callable = func
         self.args = args
@@ -715,61 +1890,271 @@ class Schedule:
         self.parent = parent
 
     @property
-    def event(self):
-        return pygame.event.Event(self.type, func=self)
+    def due(self) -> float:
+        """Simulation time (s) at which this schedule becomes ready."""
+        return self.start_time + self.delay / 1000
 
     @property
     def is_ready(self):
-        ready = (time.time() - self.start_time) * 1000 > self.delay
-        # print(ready)
-        return ready
+        return (self.parent.time - self.start_time) * 1000 > self.delay
 
     def __call__(self):
-        if self.is_ready:
-            rv = self.callable(*self.args, **self.kwargs)
-            self.parent.all_enemies.add(rv)
-            self.parent.all_sprites.add(rv)
-            # Tell the game one pending spawn has been delivered so it can
-            # decide when the wave is fully out and the next one may start.
-            on_spawned = getattr(self.parent, "_on_schedule_spawned", None)
+        rv = self.callable(*self.args, **self.kwargs)
+        self.parent.add_enemy(rv)
+        # Tell the game one pending spawn has been delivered so it can
+        # decide when the wave is fully out and the next one may start.
+        on_spawned = getattr(self.parent, "_on_schedule_spawned", None)
+        if on_spawned is not None:
+            on_spawned()
+
+
+class SpawnGroup(Schedule):
+    """``count`` spawns of ``func``, ``burst`` at a time every ``interval`` ms.
+
+    Queued as a single Scheduler entry that re-queues itself after each
+    burst, so a wave of thousands costs one object per group rather than
+    one Schedule per enemy. Lanes alternate by spawn index and each enemy's
+    HP is multiplied by ``hp_scale``.
+    """
+
+    def __init__(
+        self, func, *args, count=1, interval=1200, burst=1, hp_scale=1.0, **kwargs
+    ):
+        super().__init__(func, *args, **kwargs)
+        self.count = count
+        self.interval = interval
+        self.burst = burst
+        self.hp_scale = hp_scale
+        self.spawned = 0
+
+    @property
+    def remaining(self) -> int:
+        return self.count - self.spawned
+
+    def __call__(self):
+        parent = self.parent
+        for _ in range(min(self.burst, self.remaining)):
+            enemy = self.callable(*self.args, **self.kwargs, left=bool(self.spawned % 2))
+            self.spawned += 1
+            if self.hp_scale != 1:
+                enemy.max_hp = round(enemy.max_hp * self.hp_scale)
+                enemy.hp = enemy.max_hp
+            parent.add_enemy(enemy)
+            on_spawned = getattr(parent, "_on_schedule_spawned", None)
             if on_spawned is not None:
                 on_spawned()
-        else:
-            pygame.event.post(self.event)
+        if self.remaining:
+            self.delay += self.interval
+            parent.scheduler.add(self)
 
 
-class Game(General):
-    def __init__(
-        self, money=200, width=1800, height=600, level=0, fps=180, *args, **kwargs
-    ):
-        kwargs = kwargs | {"width": width, "height": height}
-        super().__init__(*args, **kwargs)
-        self.level = level
-        self.screen = pygame.display.set_mode((self.width, self.height))
+class Scheduler:
+    """Min-heap of Schedules ordered by due time, then insertion order.
+
+    Each tick only the due head of the heap is touched, so thousands of
+    pending spawns cost O(log n) per push/pop instead of a scan per tick.
+    Timing is in simulation seconds, so nothing comes due while the game is
+    paused. Cancelled entries are skipped lazily when they reach the top.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, Schedule]] = []
+        self._order = itertools.count()
+        self._live = 0
+
+    def __len__(self):
+        return self._live
+
+    def add(self, schedule: Schedule) -> Schedule:
+        heapq.heappush(self._heap, (schedule.due, next(self._order), schedule))
+        schedule.queued = True
+        self._live += 1
+        return schedule
+
+    def cancel(self, schedule: Schedule) -> bool:
+        """Drop a pending schedule. Returns False if it already ran or was cancelled."""
+        if not schedule.queued:
+            return False
+        schedule.queued = False
+        schedule.cancelled = True
+        self._live -= 1
+        return True
+
+    def pop_due(self):
+        """Yield, in due order, every pending schedule that is ready now."""
+        heap = self._heap
+        while heap and (heap[0][2].cancelled or heap[0][2].is_ready):
+            schedule = heapq.heappop(heap)[2]
+            if not schedule.cancelled:
+                schedule.queued = False
+                self._live -= 1
+                yield schedule
+
+
+class SimStats:
+    """Stand-in for the HUD when no Game is attached: keeps the event log."""
+
+    def __init__(self):
+        self.log = deque(maxlen=6)
+
+
+class Waves:
+    """Wave definitions, read from a JSON file such as ``assets/waves.json``.
+
+    ``{"waves": [wave, ...], "endless": {...}}``, where each wave is
+    ``{"hp_scale": 1.0, "groups": [group, ...]}`` and each group is
+    ``{"enemy": "Golem", "count": 22, "interval_ms": 1200, "burst": 1,
+    "delay_ms": 0, "hp_scale": 1.0}`` (all but ``enemy`` and ``count``
+    optional). Groups of a wave spawn side by side, each as one
+    ``SpawnGroup``. With ``endless``, the last wave repeats forever, its
+    HP and counts multiplied by ``hp_growth`` / ``count_growth`` once more
+    for every repeat.
+    """
+
+    _loaded: dict[str, "Waves"] = {}
+
+    def __init__(self, definition: dict):
+        self.definition = definition
+        self.waves = definition["waves"]
+        self.endless = definition.get("endless")
+        for wave in self.waves:
+            for group in wave["groups"]:
+                if group["enemy"] not in ENEMY_TYPES:
+                    raise ValueError(
+                        f"unknown enemy {group['enemy']!r}: expected one of "
+                        f"{', '.join(sorted(ENEMY_TYPES))}"
+                    )
+
+    @classmethod
+    def load(cls, path) -> "Waves":
+        """Parse ``path`` (once per process; treat the result as read-only)."""
+        key = Path(path).as_posix()
+        if key not in cls._loaded:
+            cls._loaded[key] = cls(json.loads(Path(path).read_text()))
+        return cls._loaded[key]
+
+    @property
+    def count(self) -> float:
+        """Number of waves; ``math.inf`` when endless."""
+        return math.inf if self.endless else len(self.waves)
+
+    def groups(self, number: int) -> list[dict]:
+        """The spawn groups of wave ``number`` (1-based), scaling applied."""
+        extra = max(0, number - len(self.waves))
+        wave = self.waves[min(number, len(self.waves)) - 1]
+        hp_growth = self.endless.get("hp_growth", 1.0) ** extra if extra else 1.0
+        count_growth = self.endless.get("count_growth", 1.0) ** extra if extra else 1.0
+        return [
+            {
+                "enemy": ENEMY_TYPES[group["enemy"]],
+                "count": round(group["count"] * count_growth),
+                "interval": group.get("interval_ms", 1200),
+                "burst": group.get("burst", 1),
+                "delay": group.get("delay_ms", 0),
+                "hp_scale": group.get("hp_scale", 1.0) * wave.get("hp_scale", 1.0) * hp_growth,
+            }
+            for group in wave["groups"]
+        ]
+
+
+class Simulation:
+    """The game world, advanced in fixed ``DT`` steps of simulation time.
+
+    Owns enemies, towers, bullets, waves, money and health. Nothing in here
+    touches ``pygame.display`` or the wall clock, so a Simulation can run
+    headless and as fast as the CPU allows; ``Game`` renders one on screen.
+    Sprites created by the world get the Simulation as their ``parent``.
+    """
+
+    TICK_RATE = 60  # simulation steps per simulated second
+
+    # Wave system constants. Tuneable in one place; the waves themselves
+    # come from the WAVES file (see Waves).
+    WAVES = Path("assets/waves.json")
+    WAVE_INTER_DELAY_MS = 4000  # pause between waves once the field is clear
+    WAVE_FIRST_DELAY_MS = 1500  # short grace period before wave 1
+
+    # Spatial hash cell size (px) for enemy lookups; about one enemy sprite.
+    GRID_CELL = 80
+    # Spent projectiles kept for reuse, per projectile class.
+    BULLET_POOL_SIZE = 256
+
+    def __init__(self, money=200, width=1800, height=600, tick_rate=None, waves=None):
+        self.width = width
+        self.height = height
         self.money = money
         self.health = 30
-        self.FPS = fps
-        self.time0 = time.time()
-        self.time = time.time()
-        self.clock = pygame.time.Clock()
-        self.pause = False
+        # Sprites animate on simulation ticks, so they read FPS from here.
+        self.FPS = tick_rate or self.TICK_RATE
+        self.DT = 1 / self.FPS
+        self.tick = 0
+        self.time = 0.0
+        self.stats = SimStats()
+        self.waves = waves if isinstance(waves, Waves) else Waves.load(waves or self.WAVES)
         self.setup()
 
-    # Wave system constants. Tuneable in one place.
-    WAVE_COUNT = 4
-    WAVE_INTER_DELAY_MS = 4000  # pause between waves once the field is clear
-    WAVE_FIRST_DELAY_MS = 1500  # short grace period before wave 1
+    def setup(self):
+        # LayeredUpdates respects each sprite's _layer attr, giving us deterministic
+        # z-order: enemies (10) → towers (20) → bullets (25) → effects (30).
+        self.all_enemies = pygame.sprite.Group()
+        self.all_bullets = pygame.sprite.Group()
+        self.all_towers = pygame.sprite.Group()
+        self.all_sprites = pygame.sprite.LayeredUpdates()
+        self.bullet_pool = ProjectilePool(self.BULLET_POOL_SIZE)
+        # Enemy movement + HP live here; the sprites in all_enemies are views.
+        self.enemies = EnemyStore()
+        # Enemy centres, rebuilt every tick after enemies move.
+        self.enemy_grid = SpatialHash(self.GRID_CELL)
+        self._enemy_extent = (0, 0)  # largest half width / height ever spawned
+        self.scheduler = Scheduler()
+        # Wave state: counts incoming spawns + alive enemies to know when the
+        # field is clear and we can advance to the next wave.
+        self.wave_number = 0
+        self._wave_pending_spawns = 0
+        self._wave_clear_time: float | None = None
+        # Kick off wave 1 after a short grace period.
+        self.wave_number = 1
+        self.create_wave(offset=self.WAVE_FIRST_DELAY_MS)
+
+    @property
+    def wave_count(self) -> float:
+        """Number of waves in this level; ``math.inf`` for endless waves."""
+        return self.waves.count
+
+    def frame_requirements(self) -> list[tuple[Path, tuple[int, int], list[int]]]:
+        """Frames this level's sprites draw, as ``Preloader`` requirements.
+
+        Wave enemies, the fire effect and tower layers, all at the default
+        sprite size (80x80).
+        """
+        size = (80, 80)
+        fire = Path("assets/effects/fire")
+        tower_layers = {n for ranks in Tower.TOWERS.values() for ns in ranks for n in ns}
+        return [
+            (Golem.source, size, Golem.WALK),
+            (Viking.source, size, Viking.WALK),
+            (fire, size, list(range(CATALOGUE.count(fire)))),
+            (Path(Tower.SOURCE), size, sorted(tower_layers)),
+        ]
 
-    def create_wave(self, n_enemies=22, offset=0):
-        """Schedule a wave's enemies. Returns the number of pending spawns so
-        the caller can track when the wave has fully emerged."""
-        enemy_class = Viking if self.wave_number % 2 == 1 else Golem
-        for i in range(n_enemies):
-            s = Schedule(
-                enemy_class, delay=i * 1200 + offset, left=bool(i % 2), parent=self
+    def create_wave(self, offset=0):
+        """Schedule wave ``wave_number``: one SpawnGroup per group, however
+        many enemies it holds. Returns the number of pending spawns so the
+        caller can track when the wave has fully emerged."""
+        n_enemies = 0
+        for group in self.waves.groups(self.wave_number):
+            self.scheduler.add(
+                SpawnGroup(
+                    group["enemy"],
+                    count=group["count"],
+                    interval=group["interval"],
+                    burst=group["burst"],
+                    hp_scale=group["hp_scale"],
+                    delay=group["delay"] + offset,
+                    parent=self,
+                )
             )
-            e = pygame.event.Event(42000, func=s)
-            pygame.event.post(e)
+            n_enemies += group["count"]
         self._wave_pending_spawns += n_enemies
         return n_enemies
 
@@ -777,69 +2162,161 @@ class Game(General):
         """Schedule callback: one queued enemy has actually spawned."""
         self._wave_pending_spawns = max(0, self._wave_pending_spawns - 1)
 
+    def add_enemy(self, enemy) -> None:
+        self.all_enemies.add(enemy)
+        self.all_sprites.add(enemy)
+        self.enemies.add(enemy)
+        half_w, half_h = self._enemy_extent
+        self._enemy_extent = (
+            max(half_w, enemy.rect.width // 2 + 1),
+            max(half_h, enemy.rect.height // 2 + 1),
+        )
+
+    def _index_enemies(self) -> None:
+        grid = self.enemy_grid
+        grid.clear()
+        insert = grid.insert
+        for enemy in self.all_enemies:
+            insert(enemy, *enemy.rect.center)
+
+    def enemies_near(self, pos, radius) -> list:
+        """Live enemies whose centre is within ``radius`` of ``pos``."""
+        x, y = pos
+        r2 = radius * radius
+        hits = []
+        for enemy in self.enemy_grid.within(pos, radius):
+            ex, ey = enemy.rect.center
+            if (ex - x) ** 2 + (ey - y) ** 2 <= r2 and enemy.alive():
+                hits.append(enemy)
+        return hits
+
+    def nearest_enemy(self, pos, max_range):
+        """Closest live enemy to ``pos`` within ``max_range``, or None."""
+        candidates = (e for e in self.enemy_grid.within(pos, max_range) if e.alive())
+        return closest_enemy(pos, candidates, max_range)
+
+    def first_enemy(self, pos, max_range):
+        """Live enemy within ``max_range`` of ``pos`` that is furthest along its route."""
+        return max(
+            self.enemies_near(pos, max_range), key=lambda e: e.progress, default=None
+        )
+
+    def enemies_at(self, x, y):
+        """Enemies whose rect could contain the point; not yet hit-tested.
+
+        Any such rect has its centre within the largest half extent of it.
+        """
+        half_w, half_h = self._enemy_extent
+        return self.enemy_grid.query(x - half_w, y - half_h, x + half_w, y + half_h)
+
+    def _enemy_reached_goal(self, enemy) -> None:
+        enemy.kill()
+        self.stats.log.append(f"enemy reached goal at {enemy.rect.center}")
+        self.health -= 1
+        if self.health <= 0:
+            self.stats.log.append("game over")
+
+    def _run_schedules(self):
+        for schedule in self.scheduler.pop_due():
+            schedule()
+
+    def cancel(self, schedule: Schedule) -> None:
+        """Cancel a pending spawn (or what is left of a group); the wave no
+        longer waits for it."""
+        remaining = schedule.remaining
+        if self.scheduler.cancel(schedule):
+            self._wave_pending_spawns = max(0, self._wave_pending_spawns - remaining)
+
     def _start_next_wave(self):
         """Spawn the next wave if there is one. Idempotent if all waves done."""
-        if self.wave_number >= self.WAVE_COUNT:
+        if self.wave_number >= self.wave_count:
             return
         self.wave_number += 1
         self.create_wave()
         self._wave_clear_time = None
-        self.stats.log.append(f"wave {self.wave_number}/{self.WAVE_COUNT} incoming")
+        self.stats.log.append(f"wave {self.wave_label()} incoming")
+
+    def wave_label(self, separator: str = "/") -> str:
+        """Wave progress for display: "3/4", or just "3" when endless."""
+        if self.wave_count == math.inf:
+            return f"{self.wave_number}"
+        return f"{self.wave_number}{separator}{self.wave_count}"
 
     def _update_waves(self):
-        """Per-frame: advance to the next wave once the field is clear and
+        """Per-tick: advance to the next wave once the field is clear and
         the grace delay has elapsed."""
-        if self.wave_number >= self.WAVE_COUNT:
+        if self.wave_number >= self.wave_count:
             return
         field_clear = self._wave_pending_spawns == 0 and len(self.all_enemies) == 0
         if not field_clear:
             self._wave_clear_time = None
             return
-        # Field just cleared this frame: stamp the time.
+        # Field just cleared this tick: stamp the time.
         if self._wave_clear_time is None:
-            self._wave_clear_time = time.time()
+            self._wave_clear_time = self.time
             return
-        if (time.time() - self._wave_clear_time) * 1000 >= self.WAVE_INTER_DELAY_MS:
+        if (self.time - self._wave_clear_time) * 1000 >= self.WAVE_INTER_DELAY_MS:
             self._start_next_wave()
 
-    def setup(self):
-        # LayeredUpdates respects each sprite's _layer attr, giving us deterministic
-        # z-order: enemies (10) → towers (20) → bullets (25) → effects (30) → UI (40).
-        self.all_enemies = pygame.sprite.Group()
-        self.all_bullets = pygame.sprite.Group()
-        self.all_sprites = pygame.sprite.LayeredUpdates()
-
-        self.character = Character(source="assets/effects/fire", width=40, height=40)
-        self.stats = GameStats(parent=self)
-        # Wave state: counts incoming spawns + alive enemies to know when the
-        # field is clear and we can advance to the next wave.
-        self.wave_number = 0
-        self._wave_pending_spawns = 0
-        self._wave_clear_time: float | None = None
-        # Kick off wave 1 after a short grace period.
-        self.create_wave(offset=self.WAVE_FIRST_DELAY_MS)
-        self.wave_number = 1
-        self.all_sprites.add(self.character)
-        self.all_sprites.add(self.stats)
-        # Touch the cached background once so the path dots are baked in before the first frame.
-        self.background
-
-    def move(self, dx, dy):
-        self.character.move(dx, dy)
+    @property
+    def finished(self) -> bool:
+        """True once the player has lost, or every wave has spawned and died."""
+        if self.health <= 0:
+            return True
+        return (
+            self.wave_number >= self.wave_count
+            and self._wave_pending_spawns == 0
+            and len(self.all_enemies) == 0
+        )
 
-    def mouse_click(self, event):
-        # self.stats.log.append(f"mouse click at {event.pos}")
-        if event.button == 1:
-            self.spawn_tower(event.pos)
-        elif event.button == 3:
-            self.upgrade_tower(event.pos)
+    def step(self) -> None:
+        """Advance the world by one fixed ``DT``."""
+        self.tick += 1
+        self.time = self.tick * self.DT
+        section = PROFILER.section
+        with section("spawns"):
+            self._run_schedules()
+        with section("enemies"):
+            for enemy in self.enemies.step(self.DT):
+                self._enemy_reached_goal(enemy)
+            self._index_enemies()
+        with section("sprites"):
+            self.all_sprites.update()
+        with section("waves"):
+            self._update_waves()
+
+    def run(self, max_seconds: float | None = None) -> None:
+        """Step until ``finished`` (or ``max_seconds`` of simulation time)."""
+        max_ticks = None if max_seconds is None else int(max_seconds * self.FPS)
+        while not self.finished and (max_ticks is None or self.tick < max_ticks):
+            self.step()
+
+    def fire(self, cls, **kwargs):
+        """Launch a projectile of class ``cls``, recycled from the pool if possible."""
+        bullet = self.bullet_pool.acquire(cls, parent=self, **kwargs)
+        self.all_sprites.add(bullet)
+        self.all_bullets.add(bullet)
+        return bullet
+
+    def apply(self, action: str, pos=(0, 0)) -> None:
+        """Apply one player action: "tower" or "upgrade" at ``pos``, "money", "heal"."""
+        if action == "tower":
+            self.spawn_tower(pos)
+        elif action == "upgrade":
+            self.upgrade_tower(pos)
+        elif action == "money":
+            self.money += 100
+        elif action == "heal":
+            self.health += 1 if self.health < 30 else 0
+        else:
+            raise ValueError(f"unknown action {action!r}")
 
     def upgrade_tower(self, pos):
-        for tower in self.all_sprites:
-            if isinstance(tower, Tower) and tower.rect.collidepoint(pos):
+        for tower in self.all_towers:
+            if tower.rect.collidepoint(pos):
                 tower.upgrade()
                 self.stats.log.append(f"tower upgraded at {pos} (rank: {tower.rank})")
-                break
+                return tower
 
     def spawn_tower(self, pos):
         if self.money < Tower.PRICE:
@@ -848,27 +2325,493 @@ class Game(General):
         self.money -= Tower.PRICE
         tower = Tower(pos=pos, parent=self)
         self.all_sprites.add(tower)
+        self.all_towers.add(tower)
         enemies = self.all_enemies.sprites()
         if enemies:
             enemies[0].put_on_fire()
         self.stats.log.append(f"tower spawned at {pos}")
+        return tower
+
+    def tower_at(self, pos):
+        for tower in self.all_towers:
+            if tower.rect.collidepoint(pos):
+                return tower
+
+
+class Snapshot:
+    """Compact, versioned binary image of a ``Simulation``.
+
+    Holds what the next ``step`` depends on: clock, money, health and wave
+    state, the wave definitions, every enemy (store rows in order), tower,
+    in-flight bullet, fire effect and pending spawn or spawn group, plus the
+    draw/update order of all sprites. Records are packed numpy structs;
+    classes, routes and tower colours are stored by their names in
+    ``ENEMY_TYPES``, ``PROJECTILE_TYPES``, ``ROUTES`` and ``Tower.TOWERS``,
+    and only those names are resolved on load (others raise ValueError).
+    Version 1 files (no wave definitions, single spawns only) still load,
+    with the default waves. No surfaces are written: restored sprites fetch
+    their frames from ``FRAMES`` like new ones. A restored world steps
+    exactly like the original.
+    """
+
+    MAGIC = b"TDSS"
+    VERSION = 2
+    # magic, version, tick rate, width, height, tick, money, health, wave,
+    # pending spawns, wave clear time (NaN: none), enemy extent (w, h)
+    _HEADER = struct.Struct("<4sHHHHIiiiIdii")
+    ENEMY = np.dtype([
+        ("cls", "u1"), ("route", "u1"), ("left", "?"), ("on_fire", "?"),
+        ("walk_frame", "i1"), ("counter", "u4"), ("progress", "f8"),
+        ("speed", "f8"), ("hp", "i4"), ("max_hp", "i4"),
+    ])
+    TOWER = np.dtype([
+        ("color", "u1"), ("rank", "u1"), ("x", "i4"), ("y", "i4"), ("last_fire", "f8"),
+    ])
+    BULLET = np.dtype([
+        ("cls", "u1"), ("damage", "i4"), ("hits_left", "i4"),
+        ("x", "f8"), ("y", "f8"), ("vx", "f8"), ("vy", "f8"),
+    ])
+    EFFECT = np.dtype([("follow", "i4"), ("counter", "u4")])  # follow -1: gone
+    SCHEDULE_V1 = np.dtype([("cls", "u1"), ("left", "?"), ("start", "f8"), ("delay", "f8")])
+    # group: 0 for a single Schedule (spawns on lane ``left``), 1 for a SpawnGroup
+    SCHEDULE = np.dtype([
+        ("cls", "u1"), ("left", "?"), ("start", "f8"), ("delay", "f8"), ("group", "u1"),
+        ("count", "u4"), ("spawned", "u4"), ("interval", "f8"), ("burst", "u4"),
+        ("hp_scale", "f8"),
+    ])
+    HIT = np.dtype([("bullet", "u4"), ("enemy", "u4")])  # Bullet._hit, by enemy row
+    ORDER = np.dtype([("kind", "u1"), ("index", "u4")])  # all_sprites, in order
+    ENEMIES, TOWERS, BULLETS, EFFECTS = range(4)
+
+    @classmethod
+    def dumps(cls, sim: "Simulation") -> bytes:
+        names: list[str] = []
+
+        def name(value, registry: dict) -> int:
+            key = next((key for key, entry in registry.items() if entry == value), None)
+            if key is None:
+                raise ValueError(f"cannot snapshot {value!r}: not one of {sorted(registry)}")
+            if key not in names:
+                names.append(key)
+            return names.index(key)
+
+        colors = {color: color for color in Tower.TOWERS}
+
+        enemies = sim.enemies.sprites
+        enemy_rows = {id(enemy): i for i, enemy in enumerate(enemies)}
+        towers, bullets, effects, order = [], [], [], []
+        for sprite in sim.all_sprites.sprites():
+            if isinstance(sprite, Effect):
+                kind, group = cls.EFFECTS, effects
+            elif id(sprite) in enemy_rows:
+                order.append((cls.ENEMIES, enemy_rows[id(sprite)]))
+                continue
+            elif isinstance(sprite, Tower):
+                kind, group = cls.TOWERS, towers
+            elif isinstance(sprite, Bullet):
+                kind, group = cls.BULLETS, bullets
+            else:
+                raise TypeError(f"cannot snapshot {sprite!r}")
+            order.append((kind, len(group)))
+            group.append(sprite)
+
+        records = [
+            np.array([
+                (
+                    name(type(e), ENEMY_TYPES), name(e.route, ROUTES), e.left, e._on_fire,
+                    -1 if e._walk_frame is None else e._walk_frame, e.counter,
+                    e.progress, e.speed, e.hp, e.max_hp,
+                )
+                for e in enemies
+            ], dtype=cls.ENEMY),
+            np.array([
+                (name(t.color, colors), t.rank, *t.pos, t._last_fire_time) for t in towers
+            ], dtype=cls.TOWER),
+            np.array([
+                (name(type(b), PROJECTILE_TYPES), b.damage, b._hits_left, *b.pos, *b._velocity)
+                for b in bullets
+            ], dtype=cls.BULLET),
+            np.array([
+                (enemy_rows.get(id(f.follow), -1), f.counter) for f in effects
+            ], dtype=cls.EFFECT),
+            np.array([
+                (
+                    name(s.callable, ENEMY_TYPES), s.kwargs.get("left", True), s.start_time,
+                    s.delay, isinstance(s, SpawnGroup), getattr(s, "count", 1),
+                    getattr(s, "spawned", 0), getattr(s, "interval", 0),
+                    getattr(s, "burst", 1), getattr(s, "hp_scale", 1.0),
+                )
+                for _, _, s in sorted(sim.scheduler._heap)
+                if not s.cancelled
+            ], dtype=cls.SCHEDULE),
+            np.array([
+                (i, enemy_rows[hit])
+                for i, b in enumerate(bullets)
+                for hit in b._hit
+                if hit in enemy_rows
+            ], dtype=cls.HIT),
+            np.array(order, dtype=cls.ORDER),
+        ]
+        clear_time = sim._wave_clear_time
+        header = cls._HEADER.pack(
+            cls.MAGIC, cls.VERSION, sim.FPS, sim.width, sim.height, sim.tick,
+            sim.money, sim.health, sim.wave_number, sim._wave_pending_spawns,
+            math.nan if clear_time is None else clear_time, *sim._enemy_extent,
+        )
+        encoded = [n.encode() for n in names]
+        table = struct.pack("<H", len(encoded)) + b"".join(
+            struct.pack("<B", len(n)) + n for n in encoded
+        )
+        body = b"".join(struct.pack("<I", len(r)) + r.tobytes() for r in records)
+        waves = json.dumps(sim.waves.definition, separators=(",", ":")).encode()
+        return header + table + body + struct.pack("<I", len(waves)) + waves
+
+    @classmethod
+    def loads(cls, data: bytes) -> "Simulation":
+        fields = cls._HEADER.unpack_from(data)
+        magic, version, tick_rate, width, height = fields[:5]
+        if magic != cls.MAGIC or version not in (1, cls.VERSION):
+            raise ValueError(f"not a snapshot (version {cls.VERSION})")
+        tick, money, health, wave, pending, clear_time, extent_w, extent_h = fields[5:]
+        offset = cls._HEADER.size
+        (count,) = struct.unpack_from("<H", data, offset)
+        offset += 2
+        names = []
+        for _ in range(count):
+            length = data[offset]
+            names.append(data[offset + 1 : offset + 1 + length].decode())
+            offset += 1 + length
+        records = []
+        schedule = cls.SCHEDULE if version > 1 else cls.SCHEDULE_V1
+        for dtype in (cls.ENEMY, cls.TOWER, cls.BULLET, cls.EFFECT, schedule, cls.HIT, cls.ORDER):
+            (count,) = struct.unpack_from("<I", data, offset)
+            offset += 4
+            records.append(np.frombuffer(data, dtype=dtype, count=count, offset=offset))
+            offset += count * dtype.itemsize
+        enemy_rows, tower_rows, bullet_rows, effect_rows, schedules, hits, order = records
+        waves = None
+        if version > 1:
+            (size,) = struct.unpack_from("<I", data, offset)
+            waves = Waves(json.loads(data[offset + 4 : offset + 4 + size]))
+
+        def lookup(index, registry: dict):
+            if index >= len(names) or names[index] not in registry:
+                raise ValueError(f"unknown name in snapshot: expected one of {sorted(registry)}")
+            return registry[names[index]]
+
+        colors = {color: color for color in Tower.TOWERS}
+
+        sim = Simulation(
+            money=money, width=width, height=height, tick_rate=tick_rate, waves=waves
+        )
+        sim.tick, sim.time = tick, tick * sim.DT
+        sim.health, sim.wave_number, sim._wave_pending_spawns = health, wave, pending
+        sim._wave_clear_time = None if math.isnan(clear_time) else clear_time
+        sim._enemy_extent = (extent_w, extent_h)
+        sim.scheduler = Scheduler()
+        for row in schedules:
+            enemy_class = lookup(row["cls"], ENEMY_TYPES)
+            if version > 1 and row["group"]:
+                schedule = SpawnGroup(
+                    enemy_class, count=int(row["count"]), interval=float(row["interval"]),
+                    burst=int(row["burst"]), hp_scale=float(row["hp_scale"]), parent=sim,
+                )
+                schedule.spawned = int(row["spawned"])
+            else:
+                schedule = Schedule(enemy_class, left=bool(row["left"]), parent=sim)
+            schedule.start_time, schedule.delay = float(row["start"]), float(row["delay"])
+            sim.scheduler.add(schedule)
+
+        enemies = []
+        for row in enemy_rows:
+            enemy = lookup(row["cls"], ENEMY_TYPES)(
+                parent=sim, left=bool(row["left"]), route=lookup(row["route"], ROUTES)
+            )
+            enemy.progress, enemy.speed = float(row["progress"]), float(row["speed"])
+            enemy.hp, enemy.max_hp = int(row["hp"]), int(row["max_hp"])
+            enemy._on_fire, enemy.counter = bool(row["on_fire"]), int(row["counter"])
+            if row["walk_frame"] >= 0:
+                enemy._walk_frame = int(row["walk_frame"])
+                enemy.image = enemy.get_image_n(enemy._walk_frame)
+            sim.enemies.add(enemy)  # store rows in their original order
+            enemies.append(enemy)
+        towers = [
+            Tower(
+                pos=(int(row["x"]), int(row["y"])), parent=sim,
+                color=lookup(row["color"], colors), rank=int(row["rank"]),
+            )
+            for row in tower_rows
+        ]
+        for tower, row in zip(towers, tower_rows):
+            tower._last_fire_time = float(row["last_fire"])
+        bullets = []
+        for row in bullet_rows:
+            bullet = sim.bullet_pool.acquire(
+                lookup(row["cls"], PROJECTILE_TYPES), pos=(row["x"], row["y"]), target=None,
+                parent=sim, direction=(1.0, 0.0), damage=int(row["damage"]),
+            )
+            bullet._hits_left = int(row["hits_left"])
+            bullet._velocity = [float(row["vx"]), float(row["vy"])]
+            bullet._render()
+            bullet.rect = bullet.image.get_rect(center=(int(row["x"]), int(row["y"])))
+            bullets.append(bullet)
+        for row in hits:
+            bullets[row["bullet"]]._hit.add(id(enemies[row["enemy"]]))
+
+        effect_rows = iter(effect_rows)
+        for kind, index in order.tolist():
+            if kind == cls.ENEMIES:
+                sim.all_enemies.add(enemies[index])
+                sim.all_sprites.add(enemies[index])
+            elif kind == cls.TOWERS:
+                sim.all_towers.add(towers[index])
+                sim.all_sprites.add(towers[index])
+            elif kind == cls.BULLETS:
+                sim.all_bullets.add(bullets[index])
+                sim.all_sprites.add(bullets[index])
+            else:
+                row = next(effect_rows)
+                follow = enemies[row["follow"]] if row["follow"] >= 0 else None
+                effect = Effect(width=80, height=80, follow=follow, parent=sim)
+                effect.counter = int(row["counter"])
+                if follow is not None:
+                    effect._place()
+        sim._index_enemies()
+        return sim
+
+    @classmethod
+    def save(cls, sim: "Simulation", path) -> Path:
+        """Write a snapshot of ``sim`` to ``path``, replacing it atomically."""
+        path = Path(path)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_bytes(cls.dumps(sim))
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path) -> "Simulation":
+        return cls.loads(Path(path).read_bytes())
+
+
+class InputLog:
+    """Player actions stamped with the simulation tick they were applied at.
+
+    Everything else in a game is deterministic (spawns come from the
+    simulation's own ``Scheduler``), so these actions are enough to replay a
+    session exactly. Saved as a header and one 9-byte record per action.
+    Ticks restart at 0 after a "reset", like the simulation's.
+    """
+
+    MAGIC = b"TDIN"
+    VERSION = 1
+    ACTIONS = ("tower", "upgrade", "money", "heal", "pause", "reset")
+    # magic, version, tick rate, start money, tick the session ended at
+    _HEADER = struct.Struct("<4sHHiI")
+    # tick, action, x, y
+    _RECORD = struct.Struct("<IBhh")
+
+    def __init__(self, money=200, tick_rate=Simulation.TICK_RATE):
+        self.money = money
+        self.tick_rate = tick_rate
+        self.end_tick = 0
+        self.entries: list[tuple[int, str, int, int]] = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def record(self, tick: int, action: str, pos=(0, 0)) -> None:
+        self.entries.append((tick, action, *pos))
+
+    def to_bytes(self) -> bytes:
+        header = self._HEADER.pack(
+            self.MAGIC, self.VERSION, self.tick_rate, self.money, self.end_tick
+        )
+        index = self.ACTIONS.index
+        return header + b"".join(
+            self._RECORD.pack(tick, index(action), x, y)
+            for tick, action, x, y in self.entries
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "InputLog":
+        magic, version, tick_rate, money, end_tick = cls._HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"not an input log (version {cls.VERSION})")
+        log = cls(money=money, tick_rate=tick_rate)
+        log.end_tick = end_tick
+        log.entries = [
+            (tick, cls.ACTIONS[action], x, y)
+            for tick, action, x, y in cls._RECORD.iter_unpack(data[cls._HEADER.size :])
+        ]
+        return log
+
+    def save(self, path) -> Path:
+        path = Path(path)
+        path.write_bytes(self.to_bytes())
+        return path
+
+    @classmethod
+    def load(cls, path) -> "InputLog":
+        return cls.from_bytes(Path(path).read_bytes())
+
+    def replay(self) -> Simulation:
+        """Re-run the session headless, as fast as possible; returns the final world."""
+        sim = Simulation(money=self.money, tick_rate=self.tick_rate)
+        for tick, action, x, y in self.entries:
+            while sim.tick < tick:
+                sim.step()
+            if action == "reset":
+                sim = Simulation(money=self.money, tick_rate=self.tick_rate)
+            elif action != "pause":  # pausing only stops the clock
+                sim.apply(action, (x, y))
+        while sim.tick < self.end_tick:
+            sim.step()
+        return sim
+
+
+class Game(General):
+    """Window, input and rendering on top of a ``Simulation``.
+
+    The simulation advances in fixed steps from an accumulator fed by the
+    frame clock; rendering runs at up to ``fps`` frames per second. At
+    ``speed`` 2 or 4 the accumulator is fed that many simulated seconds per
+    wall second; at speed 0 ("max") the simulation steps flat out and a
+    frame is only drawn every ``MAX_SPEED_SLICE``. The steps themselves are
+    the same fixed ``DT`` steps at every speed, so outcomes match 1x.
+
+    Player actions go through ``apply`` and are kept in ``recording``. Given
+    a ``replay`` log, the game applies its actions at their ticks instead of
+    live input, and stops once the log is used up.
+
+    With ``autosave`` set, a ``Snapshot`` of the world is written there every
+    ``AUTOSAVE_SECONDS`` of simulation time; ``resume`` continues from one.
+    """
+
+    # Longest stretch of wall time (s) caught up in one frame, so a stall
+    # (window drag, breakpoint) does not trigger a burst of catch-up steps.
+    MAX_FRAME_LAG = 0.25
+    # Simulation speeds cycled with F; 0 steps as fast as possible.
+    SPEEDS = (1, 2, 4, 0)
+    # Wall seconds spent stepping between two drawn frames at max speed.
+    MAX_SPEED_SLICE = 0.1
+    # Simulation seconds between autosaved snapshots.
+    AUTOSAVE_SECONDS = 5.0
+    # Frames between rebuilds of the profiler overlay (F3).
+    PROFILE_REFRESH = 30
+
+    def __init__(
+        self,
+        money=200,
+        width=1800,
+        height=600,
+        level=0,
+        fps=180,
+        dirty_rects=False,
+        preload=True,
+        speed=1,
+        recording=None,
+        replay=None,
+        autosave=None,
+        *args,
+        **kwargs,
+    ):
+        kwargs = kwargs | {"width": width, "height": height}
+        super().__init__(*args, **kwargs)
+        self.level = level
+        self.screen = pygame.display.set_mode((self.width, self.height))
+        # Frames loaded before a display existed (headless runs) skipped
+        # convert_alpha and blit slowly; reload them in display format.
+        FRAMES.clear()
+        self.FPS = fps
+        # Repaint and present only the regions that changed (see render).
+        self.dirty_rects = dirty_rects
+        # Decode the level's frames in the background (see Preloader).
+        self.preload = preload
+        self.speed = speed
+        self.recording = recording if recording is not None else InputLog(money=money)
+        # Actions still to replay, and where the replayed session ended.
+        if isinstance(replay, InputLog):
+            self._replay_end = replay.end_tick
+            replay = deque(replay.entries)
+        self._replay = replay
+        self.autosave = autosave
+        self._autosaved = 0.0
+        self.time0 = time.time()
+        self.time = 0.0
+        self.clock = pygame.time.Clock()
+        self.pause = False
+        self.sim = Simulation(money=money, width=width, height=height)
+        self.setup()
+
+    def setup(self):
+        # UI sprites are drawn after the world: the HUD sits on layer 40.
+        self.ui_sprites = pygame.sprite.LayeredUpdates()
+        self.character = Character(source="assets/effects/fire", width=40, height=40)
+        self.stats = GameStats(parent=self)
+        # The world logs straight into the HUD.
+        self.sim.stats = self.stats
+        self.ui_sprites.add(self.character)
+        self.ui_sprites.add(self.stats)
+        # Dirty-rect mode: overlay areas drawn last frame, and whether the
+        # whole screen must be repainted (first frame, after a reset).
+        self._overlay_rects: list[pygame.Rect] = []
+        self._full_redraw = True
+        # Touch the cached background once so the path dots are baked in before the first frame.
+        self.background
+        self.preloader = Preloader(self.sim.frame_requirements() if self.preload else [])
+        self.preloader.start()
+
+    def move(self, dx, dy):
+        self.character.move(dx, dy)
+
+    def apply(self, action: str, pos=(0, 0)) -> None:
+        """Apply a player action (see ``InputLog.ACTIONS``) and record it."""
+        self.recording.record(self.sim.tick, action, pos)
+        if action == "pause":
+            self.pause = not self.pause
+        elif action == "reset":
+            self.cleanup()
+        else:
+            self.sim.apply(action, pos)
+
+    @property
+    def replaying(self) -> bool:
+        return self._replay is not None
+
+    @property
+    def replay_done(self) -> bool:
+        return self.replaying and not self._replay and self.sim.tick >= self._replay_end
+
+    def _step(self) -> None:
+        """One simulation step, after any replayed actions due at this tick."""
+        pending = self._replay
+        while pending and pending[0][0] <= self.sim.tick:
+            _, action, x, y = pending.popleft()
+            if action != "pause":  # replays run through paused stretches
+                self.apply(action, (x, y))
+        if not self.replay_done:
+            self.sim.step()
+
+    def mouse_click(self, event):
+        # self.stats.log.append(f"mouse click at {event.pos}")
+        if event.button == 1:
+            self.apply("tower", event.pos)
+        elif event.button == 3:
+            self.apply("upgrade", event.pos)
 
     def mouse_hover(self, event):
-        self._hovered_tower = None
-        for tower in self.all_sprites:
-            if isinstance(tower, Tower) and tower.rect.collidepoint(event.pos):
-                self._hovered_tower = tower
-                break
+        self._hovered_tower = self.sim.tower_at(event.pos)
 
-    def _draw_range_overlay(self) -> None:
+    def _draw_range_overlay(self) -> pygame.Rect | None:
         """Draw the hover range ring on top of all sprites. Called every frame.
+        Returns the screen area touched, if any.
 
         The ring is a narrow whitish-blue gradient: bright/white at the core,
         fading out to a soft blue at the inner and outer edges.
         """
         tower = getattr(self, "_hovered_tower", None)
         if tower is None or not tower.alive():
-            return
+            return None
 
         r = tower.range
         # 5 concentric strokes, offsets in pixels from the nominal radius.
@@ -885,16 +2828,54 @@ class Game(General):
         center = (size // 2, size // 2)
         for offset, color in strokes:
             pygame.draw.circle(surf, color, center, r + offset, width=1)
-        self.screen.blit(surf, surf.get_rect(center=tower.pos))
+        return self.screen.blit(surf, surf.get_rect(center=tower.pos))
+
+    @cached_property
+    def profile_font(self):
+        return pygame.font.Font(None, 18)
+
+    def _draw_profile_overlay(self) -> pygame.Rect | None:
+        """Per-stage timings in the top left corner while PROFILER is on (F3).
 
-    def _draw_health_bars(self) -> None:
+        Each row shows p50/p99/max over the rolling window and a bar of p99
+        against the frame budget (red once a stage alone exceeds it). The
+        panel is rebuilt every ``PROFILE_REFRESH`` frames, not every frame.
+        """
+        if not PROFILER.enabled:
+            return None
+        panel = getattr(self, "_profile_panel", None)
+        if panel is None or self.counter % self.PROFILE_REFRESH == 0:
+            panel = self._profile_panel = self._build_profile_panel()
+        return self.screen.blit(panel, (10, 10))
+
+    def _build_profile_panel(self) -> pygame.Surface:
+        report = PROFILER.summary()
+        budget_ms = 1000 / self.FPS
+        row_h, bar_x, bar_w = 16, 300, 100
+        panel = pygame.Surface((bar_x + bar_w + 10, row_h * (len(report) + 1) + 8))
+        panel.set_alpha(200)
+        white = (255, 255, 255)
+        header = f"stage: p50 / p99 / max ms  (budget {budget_ms:.1f} ms)"
+        panel.blit(render_text(self.profile_font, header, white), (5, 4))
+        for i, (name, row) in enumerate(report.items(), start=1):
+            line = f"{name}: {row['p50_ms']:.2f} / {row['p99_ms']:.2f} / {row['max_ms']:.2f}"
+            panel.blit(render_text(self.profile_font, line, white), (5, 4 + row_h * i))
+            ratio = row["p99_ms"] / budget_ms
+            color = (220, 60, 60) if ratio > 1 else (80, 200, 80)
+            width = max(1, int(bar_w * min(ratio, 1.0)))
+            pygame.draw.rect(panel, color, (bar_x, 6 + row_h * i, width, row_h - 6))
+        return panel
+
+    def _draw_health_bars(self) -> list[pygame.Rect]:
         """Tiny HP bar above each enemy. Drawn each frame in a post-pass.
 
         Lives outside the sprite ``image`` so we don't re-rasterize the enemy
-        sprite on every tick — same approach as the range overlay.
+        sprite on every tick — same approach as the range overlay. Returns
+        the bar rects.
         """
         bar_w, bar_h = 30, 4
-        for enemy in self.all_enemies:
+        bars = []
+        for enemy in self.sim.all_enemies:
             if enemy.max_hp <= 0:
                 continue
             ratio = max(0.0, min(1.0, enemy.hp / enemy.max_hp))
@@ -906,12 +2887,35 @@ class Game(General):
             color = (int(255 * (1 - ratio)), int(200 * ratio), 40)
             if fg_w > 0:
                 pygame.draw.rect(self.screen, color, (x, y, fg_w, bar_h))
-            pygame.draw.rect(self.screen, (0, 0, 0), (x, y, bar_w, bar_h), width=1)
+            bars.append(
+                pygame.draw.rect(self.screen, (0, 0, 0), (x, y, bar_w, bar_h), width=1)
+            )
+        return bars
 
-    def update(self, *args: Any, **kwargs: Any) -> None:
-        super().update(*args, **kwargs)
-        self.all_sprites.update()
-        self._update_waves()
+    def update(self, frame_dt: float = 0.0) -> None:
+        """Per rendered frame: feed ``frame_dt`` wall seconds to the simulation
+        as whole fixed steps, then update the UI."""
+        super().update()
+        self.time = time.time() - self.time0
+        self.Dt.append(self.time)
+        if not self.preloader.finished:
+            self.preloader.pump()
+        if not self.pause and self.speed:
+            lag = getattr(self, "_lag", 0.0) + frame_dt * self.speed
+            self._lag = min(lag, self.MAX_FRAME_LAG * self.speed)
+            while self._lag >= self.sim.DT:
+                self._step()
+                self._lag -= self.sim.DT
+        elif not self.pause:
+            self._lag = 0.0
+            deadline = time.perf_counter() + self.MAX_SPEED_SLICE
+            while not self.sim.finished and not self.replay_done and time.perf_counter() < deadline:
+                self._step()
+        if self.autosave and self.sim.time - self._autosaved >= self.AUTOSAVE_SECONDS:
+            Snapshot.save(self.sim, self.autosave)
+            self._autosaved = self.sim.time
+        with PROFILER.section("hud"):
+            self.ui_sprites.update()
 
     @cached_property
     def background(self) -> pygame.Surface:
@@ -922,96 +2926,303 @@ class Game(General):
         return bgd
 
     def cleanup(self):
-        self.all_sprites.empty()
+        self.sim.all_sprites.empty()
+        self.preloader.close()  # setup() starts a new one
         # Invalidate cached background so a new level rebuilds it.
         self.__dict__.pop("background", None)
-        self.__init__()
+        self.__init__(
+            money=self.recording.money,  # the session's starting money, as on replay
+            dirty_rects=self.dirty_rects,
+            preload=self.preload,
+            speed=self.speed,
+            recording=self.recording,
+            replay=self._replay,
+            autosave=self.autosave,
+        )
 
-    def run(self):
-        run = True
+    def next_speed(self) -> int:
+        """The speed after the current one in ``SPEEDS``, wrapping around.
 
-        while run:
-            #     if self.time > 2 and not any([isinstance(inst, Effect) for inst in self.all_sprites.__iter__()]) and self.time< 3:
-            #         for enemy in self.all_enemies:
-            #             fire = Effect(width=80, height=80, follow=enemy, source='assets/effects/fire')
-            #             self.all_sprites.add(fire)
-
-            while self.pause:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        self.pause = False
-                        run = False
-                        break
-                    if event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_ESCAPE:
-                            self.pause = False
-                            run = False
-                            break
-                        if event.key == pygame.K_p:
-                            # unpause
-                            self.pause = not self.pause
-                            time_offset = time.time() - time_paused
-                            self.time0 += time_offset
-                self.clock.tick(self.FPS)
-            if not run:
-                break
+        A speed not in ``SPEEDS`` (``Game(speed=3)``) moves on to the next
+        faster one listed.
+        """
+        if self.speed in self.SPEEDS:
+            i = self.SPEEDS.index(self.speed) + 1
+        else:
+            i = next(i for i, s in enumerate(self.SPEEDS) if not s or s > self.speed)
+        return self.SPEEDS[i % len(self.SPEEDS)]
 
-            self.time = time.time() - self.time0
-            for event in pygame.event.get():  # Retrieve all pending events
-                if event.type == pygame.QUIT:
-                    run = False
-                    continue
-                if event.type == 42000 and hasattr(event, "func"):
-                    event.func()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        run = False
-                    if event.key == pygame.K_LEFT:
-                        self.move(-10, 0)
-                    if event.key == pygame.K_RIGHT:
-                        self.move(10, 0)
-                    if event.key == pygame.K_UP:
-                        self.move(0, -10)
-                    if event.key == pygame.K_DOWN:
-                        self.move(0, 10)
-                    if event.key == pygame.K_m:
-                        self.money += 100
-                    if event.key == pygame.K_h:
-                        self.health += 1 if self.health < 30 else 0
-                    if event.key == pygame.K_p:
-                        time_paused = time.time()
-                        self.pause = not self.pause
-                    if event.key == pygame.K_r and (
-                        pygame.key.get_mods() & pygame.KMOD_CTRL
-                    ):
-                        self.cleanup()
-                        # game = Game()
-                # mouse click
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    self.mouse_click(event)
-                if event.type == pygame.MOUSEMOTION:
-                    self.mouse_hover(event)
-
-            self.update()
-            self.clock.tick(self.FPS)
-
-            # Single, obvious render pipeline: background → sprites (z-ordered by
-            # _layer) → range overlay → flip. No dirty-rect bookkeeping.
+    def resume(self, sim: Simulation) -> None:
+        """Continue from ``sim`` (e.g. a ``Snapshot.load``) instead of the current world.
+
+        ``recording`` still replays from a fresh ``Simulation``, so it does not
+        describe a resumed session (the CLI refuses ``--record`` with ``--resume``).
+        """
+        self.sim = self.stats.sim = sim
+        sim.stats = self.stats
+        self._lag = 0.0  # wall time owed to the old world, not this one
+        self._hovered_tower = None
+        self._autosaved = sim.time
+        self._full_redraw = True
+
+    def handle_event(self, event) -> bool:
+        """Apply one pygame event. Returns False when the player asked to quit."""
+        if event.type == pygame.QUIT:
+            return False
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                return False
+            if event.key == pygame.K_F3:
+                PROFILER.enabled = not PROFILER.enabled
+            if event.key == pygame.K_f:
+                self.speed = self.next_speed()
+            if self.replaying:
+                return True
+            if event.key == pygame.K_p:
+                self.apply("pause")
+            if self.pause:
+                return True
+            if event.key == pygame.K_LEFT:
+                self.move(-10, 0)
+            if event.key == pygame.K_RIGHT:
+                self.move(10, 0)
+            if event.key == pygame.K_UP:
+                self.move(0, -10)
+            if event.key == pygame.K_DOWN:
+                self.move(0, 10)
+            if event.key == pygame.K_m:
+                self.apply("money")
+            if event.key == pygame.K_h:
+                self.apply("heal")
+            if event.key == pygame.K_r and (pygame.key.get_mods() & pygame.KMOD_CTRL):
+                self.apply("reset")
+        if self.pause or self.replaying:
+            return True
+        # mouse click
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            self.mouse_click(event)
+        if event.type == pygame.MOUSEMOTION:
+            self.mouse_hover(event)
+        return True
+
+    def render(self) -> None:
+        # Single, obvious render pipeline: background → world sprites (z-ordered
+        # by _layer) → HUD → overlays → flip.
+        if self.dirty_rects:
+            self._render_dirty()
+            return
+        section = PROFILER.section
+        with section("draw"):
             self.screen.blit(self.background, (0, 0))
-            self.all_sprites.draw(self.screen)
+            self.sim.all_sprites.draw(self.screen)
+            self.ui_sprites.draw(self.screen)
+        with section("overlays"):
             self._draw_range_overlay()
             self._draw_health_bars()
+            self._draw_profile_overlay()
+        with section("flip"):
             pygame.display.flip()
 
+    def _render_dirty(self) -> None:
+        """Same pipeline, but only erase and present what moved.
+
+        Erase every area drawn last frame (sprite rects tracked by the
+        LayeredUpdates groups, plus overlay rects) with the background, redraw
+        sprites and overlays, then ``display.update`` just the union of old
+        and new areas instead of blitting and flipping the whole screen.
+        """
+        screen, background = self.screen, self.background
+        section = PROFILER.section
+        with section("draw"):
+            if self._full_redraw:
+                screen.blit(background, (0, 0))
+            else:
+                self.sim.all_sprites.clear(screen, background)
+                self.ui_sprites.clear(screen, background)
+                for rect in self._overlay_rects:
+                    screen.blit(background, rect, rect)
+            dirty = self.sim.all_sprites.draw(screen) + self.ui_sprites.draw(screen)
+        with section("overlays"):
+            overlays = [self._draw_range_overlay(), self._draw_profile_overlay()]
+            overlays = [rect for rect in overlays if rect is not None]
+            overlays += self._draw_health_bars()
+        dirty += self._overlay_rects + overlays
+        self._overlay_rects = overlays
+        with section("flip"):
+            if self._full_redraw:
+                self._full_redraw = False
+                pygame.display.flip()
+            else:
+                pygame.display.update(dirty)
+
+    def loading_screen(self) -> bool:
+        """Show a progress bar until the preloader is done.
+
+        Returns False if the player closed the window meanwhile. A frame the
+        preloader cannot decode raises here rather than stalling the bar.
+        """
+        bar = pygame.Rect(0, 0, self.width // 3, 24)
+        bar.center = (self.width // 2, self.height // 2)
+        font = pygame.font.Font(None, 32)
+        while not self.preloader.pump(budget=1 / self.FPS):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return False
+            self.screen.blit(self.background, (0, 0))
+            pygame.draw.rect(self.screen, (40, 40, 40), bar)
+            done = bar.copy()
+            done.width = int(bar.width * self.preloader.progress)
+            pygame.draw.rect(self.screen, (219, 172, 52), done)
+            pygame.draw.rect(self.screen, (255, 255, 255), bar, width=2)
+            label = f"Loading {self.preloader.progress:.0%}"
+            text = font.render(label, True, (255, 255, 255))
+            self.screen.blit(text, text.get_rect(midbottom=(bar.centerx, bar.top - 8)))
+            pygame.display.flip()
+        self._full_redraw = True
+        self.clock.tick()  # the load time is not simulation time
+        return True
+
+    def run(self):
+        run = self.loading_screen()
+        section = PROFILER.section
+        while run:
+            with section("events"):
+                for event in pygame.event.get():  # Retrieve all pending events
+                    if not self.handle_event(event):
+                        run = False
+                        break
+            # At max speed update() paces itself; don't sleep on top of it.
+            flat_out = not (self.speed or self.pause or self.sim.finished)
+            frame_dt = self.clock.tick(0 if flat_out else self.FPS) / 1000
+            # Work per frame, excluding the clock's sleep.
+            with section("frame"):
+                self.update(frame_dt)
+                self.render()
+            if self.replay_done:
+                run = False
+
+        self.recording.end_tick = self.sim.tick
         pygame.quit()
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tower defence")
+    parser.add_argument(
+        "--write-manifest",
+        action="store_true",
+        help=f"index the assets tree into {CATALOGUE.manifest} and exit",
+    )
+    parser.add_argument(
+        "--write-atlas",
+        action="store_true",
+        help="pack all sprite frames into texture atlas pages under assets/ and exit",
+    )
+    parser.add_argument(
+        "--frame-cache",
+        action="store_true",
+        help=f"keep decoded, scaled frames in {RAW_FRAMES.directory} for faster launches",
+    )
+    parser.add_argument(
+        "--watch-assets",
+        action="store_true",
+        help="pick up added or changed frames while running (development)",
+    )
+    parser.add_argument(
+        "--dirty-rects",
+        action="store_true",
+        help="repaint only changed screen regions (cheaper on slow machines)",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="run the simulation without a window as fast as possible and print the outcome",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time each frame stage from the start (toggle in game with F3)",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="on exit, save the player's actions to PATH for --replay",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="replay a --record file at max speed (with --headless: without a window)",
+    )
+    parser.add_argument(
+        "--autosave",
+        metavar="PATH",
+        help=f"snapshot the game to PATH every {Game.AUTOSAVE_SECONDS:g}s of game time",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="PATH",
+        help="continue from a snapshot (e.g. an --autosave file) if PATH exists",
+    )
+    parser.add_argument(
+        "--speed",
+        choices=["1", "2", "4", "max"],
+        default="1",
+        help="simulation speed; max skips frames nobody would see (cycle in game with F)",
+    )
+    parser.add_argument(
+        "--profile-out",
+        metavar="PATH",
+        help="on exit, write stage timings to PATH (.json, otherwise CSV)",
+    )
+    args = parser.parse_args()
+    if args.resume and (args.record or args.replay):
+        # Input logs replay from a fresh world, not from a snapshot.
+        parser.error("--resume cannot be combined with --record or --replay")
+    if args.write_manifest:
+        print(CATALOGUE.write_manifest())
+        raise SystemExit
+    if args.write_atlas:
+        print(ATLAS.pack(CATALOGUE))
+        raise SystemExit
+    CATALOGUE.watch = args.watch_assets
+    RAW_FRAMES.enabled = args.frame_cache
+    # Changed frames are read from their files, not from a stale atlas.
+    ATLAS.enabled = not args.watch_assets
+    if args.headless:
+        start = time.perf_counter()
+        if args.replay:
+            sim = InputLog.load(args.replay).replay()
+        else:
+            resume = args.resume and Path(args.resume).exists()
+            sim = Snapshot.load(args.resume) if resume else Simulation()
+            sim.run()
+        print(
+            f"wave {sim.wave_label()}, health {sim.health}, "
+            f"money {sim.money}, {sim.time:.1f}s simulated "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+        raise SystemExit
+
     pygame.init()
     pygame.font.init()
-    game = Game(source="assets/level", level=0)
-
+    game = Game(
+        source="assets/level",
+        level=0,
+        dirty_rects=args.dirty_rects,
+        speed=0 if args.speed == "max" or args.replay else int(args.speed),
+        replay=InputLog.load(args.replay) if args.replay else None,
+        autosave=args.autosave,
+    )
+    if args.resume and Path(args.resume).exists():
+        game.resume(Snapshot.load(args.resume))
+
+    PROFILER.enabled = args.profile
     game.run()
+    if args.record:
+        print(f"{len(game.recording)} actions recorded to {game.recording.save(args.record)}")
+    if args.profile_out:
+        print(f"stage timings written to {PROFILER.dump(args.profile_out)}")
 
     # import cProfile as profile
     # with profile.Profile() as pr:
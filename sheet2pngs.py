@@ -20,10 +20,32 @@ def measuring_tape(image, major_marker=500, minor_marker=100, color=((255,0,0),
         draw.line((0, y, image.width, y), fill=color[1], width=2)
     return image
 
+def _window_any(row, lo=-2, hi=1):
+    '''
+    any(row[x+lo : x+hi+1]) for every x of a 1-D bool array, clipped at the edges
+    '''
+    out = np.zeros_like(row)
+    for shift in range(lo, hi + 1):
+        if shift == 0:
+            out |= row
+        elif shift < 0:
+            out[-shift:] |= row[:shift]
+        elif shift > 0:
+            out[:-shift] |= row[shift:]
+    return out
+
 def make_transparent(frame, transparent_color=(222,222,222), window_size=2):
     '''
     replace transparent_color with transparent pixels
 
+    A pixel is keyed out when each channel of transparent_color occurs
+    somewhere (independently) in the window of rows y-2..y+1 and columns
+    x-2..x+1 around it. Pixels are visited in raster order and rewritten in
+    place, so already keyed pixels above and to the left count with their
+    new value. Rows are processed as whole numpy vectors; only pixels whose
+    result hinges on the two left neighbours of the same row are resolved
+    one by one.
+
     Parameters:
     -----------
     frame: PIL.Image
@@ -33,24 +55,55 @@ def make_transparent(frame, transparent_color=(222,222,222), window_size=2):
         color to be replaced with transparent pixels
     
     window_size: int
-        size of window to search for transparent_color
+        ignored, the window is always 2 (kept for compatibility)
     '''
     assert frame.mode == 'RGBA', "frame must be RGBA"
     array = np.array(frame)
-    window_size = 2
-    for y in range(array.shape[0]):
-        for x in range(array.shape[1]):
-            win_xmin = max(0, x - window_size)
-            win_xmax = min(array.shape[1], x + window_size)
-            win_ymin = max(0, y - window_size)
-            win_ymax = min(array.shape[0], y + window_size)
-            R = array[win_ymin:win_ymax, win_xmin:win_xmax, 0]
-            G = array[win_ymin:win_ymax, win_xmin:win_xmax, 1]
-            B = array[win_ymin:win_ymax, win_xmin:win_xmax, 2]
-            if transparent_color[0] in R and transparent_color[1] in G and transparent_color[2] in B:
-                array[y, x, :] = [255, 255, (transparent_color[2]+1)%255, 0]
-            else:
-                pass
+    height, width = array.shape[:2]
+    keyed_value = [255, 255, (transparent_color[2]+1)%255, 0]
+    # per channel: does the original pixel match the key / does a keyed one
+    match = [array[:, :, c] == transparent_color[c] for c in range(3)]
+    keyed_match = [keyed_value[c] == transparent_color[c] for c in range(3)]
+    keyed = np.zeros((height, width), dtype=bool)
+
+    def current(c, y):
+        # channel c of row y matches the key, given the keying done so far
+        return np.where(keyed[y], keyed_match[c], match[c][y])
+
+    for y in range(height):
+        # evidence not depending on this row's keying: rows above (final),
+        # this pixel and the one to its right, and the row below (original)
+        static = []
+        maybe_left = []
+        sure_left = []
+        for c in range(3):
+            seen = _window_any(match[c][y], 0, 1)
+            for above in (y - 2, y - 1):
+                if above >= 0:
+                    seen |= _window_any(current(c, above))
+            if y + 1 < height:
+                seen |= _window_any(match[c][y + 1])
+            static.append(seen)
+            # what the two left neighbours could / will surely add
+            maybe = match[c][y] | keyed_match[c]
+            sure = match[c][y] & keyed_match[c]
+            maybe_left.append(_window_any(maybe, -2, -1))
+            sure_left.append(_window_any(sure, -2, -1))
+        # keyed whatever the left neighbours turn out to be / maybe keyed
+        row = np.logical_and.reduce([s | l for s, l in zip(static, sure_left)])
+        possible = np.logical_and.reduce([s | l for s, l in zip(static, maybe_left)])
+        keyed[y] = row
+        # the rest depends on how the left neighbours were keyed: walk them in order
+        for x in np.flatnonzero(possible & ~row):
+            keyed[y, x] = all(
+                static[c][x] or any(
+                    keyed_match[c] if keyed[y, n] else match[c][y, n]
+                    for n in range(max(0, x - 2), x)
+                )
+                for c in range(3)
+            )
+
+    array[keyed] = keyed_value
     return Image.fromarray(array)
 
 def strip_frame(frame):
@@ -72,6 +125,13 @@ def strip_frame(frame):
     array = array[ymin:ymax, xmin:xmax, :]
     return Image.fromarray(array)
 
+def frame_path(source_path, i):
+    '''
+    where frame i cut from source_path goes: <dir>/<dir name>_<i:02d>.png
+    '''
+    path = Path(source_path)
+    return path.parent / f"{path.parent.stem}_{i:02d}.png"
+
 def sprite_splitter(sprite_sheet_path, crop_zones, transparent_color=None, show=False):
     '''
     split sprite sheet into single frames
@@ -105,15 +165,14 @@ def sprite_splitter(sprite_sheet_path, crop_zones, transparent_color=None, show=
 
     color = 'magenta'
     draw = ImageDraw.Draw(image_measured)
+    sheet = image.convert("RGBA")
     for i, crop_zone in enumerate(crop_zones):
-        frame = image.copy().convert("RGBA")
-        frame = frame.crop(crop_zone)
+        frame = sheet.crop(crop_zone)
 
         frame = make_transparent(frame, transparent_color=transparent_color)
         frame = strip_frame(frame)
         
-        frame_path = path.parent / f"{path.parent.stem}_{i:02d}.png"
-        frame.save(frame_path)
+        frame.save(frame_path(path, i))
 
         # add rectangle to image
         draw.rectangle(crop_zone, outline=color, width=5)
@@ -125,40 +184,49 @@ def sprite_splitter(sprite_sheet_path, crop_zones, transparent_color=None, show=
         image_measured.show()
 
 
+# source sheets: path -> (crop zones, transparent color)
+_FIRE_Y = (250, 1700)
+SHEETS = {
+    'assets/effects/fire/fire_sheet.png': (
+        [
+            (100, _FIRE_Y[0], 380, _FIRE_Y[1]),
+            (440, _FIRE_Y[0], 780, _FIRE_Y[1]),
+            (830, _FIRE_Y[0], 1160, _FIRE_Y[1]),
+            (1190, _FIRE_Y[0], 1600, _FIRE_Y[1]),
+            (1620, _FIRE_Y[0], 2070, _FIRE_Y[1]),
+            (2100, _FIRE_Y[0], 2600, _FIRE_Y[1]),
+            (2600, _FIRE_Y[0], 2980, _FIRE_Y[1]),
+            (3050, _FIRE_Y[0], 3320, _FIRE_Y[1]),
+            (3365, _FIRE_Y[0], 3490, _FIRE_Y[1]),
+        ],
+        (3, 1, 43),
+    ),
+    'assets/sprites/viking/viking_sheet.jpg': (
+        [
+            (500, 570, 1450, 1380),
+            (1550, 570, 2450, 1380),
+            (2500, 570, 3450, 1380),
+            (3550, 570, 4500, 1380),
+            (4600, 570, 5500, 1380),
+            (500, 1750, 1450, 2560),
+            (1550, 1750, 2450, 2560),
+            (2500, 1750, 3450, 2560),
+            (3550, 1750, 4500, 2560),
+            (4600, 1750, 5500, 2560),
+        ],
+        (255, 255, 255),
+    ),
+}
+
 def fire():
     sprite_sheet_path = 'assets/effects/fire/fire_sheet.png'
-
-    y = (250, 1700)
-    crop_zones = [
-        (100, y[0], 380, y[1]),
-        (440, y[0], 780, y[1]),
-        (830, y[0], 1160, y[1]),
-        (1190, y[0], 1600, y[1]),
-        (1620, y[0], 2070, y[1]),
-        (2100, y[0], 2600, y[1]),
-        (2600, y[0], 2980, y[1]),
-        (3050, y[0], 3320, y[1]),
-        (3365, y[0], 3490, y[1]),
-    ]
-    sprite_splitter(sprite_sheet_path, crop_zones, transparent_color=(3, 1, 43), show=True)
+    crop_zones, transparent_color = SHEETS[sprite_sheet_path]
+    sprite_splitter(sprite_sheet_path, crop_zones, transparent_color=transparent_color, show=True)
 
 def viking():
     sprite_sheet_path = 'assets/sprites/viking/viking_sheet.jpg'
-
-    crop_zones = [
-        (500, 570, 1450, 1380),
-        (1550, 570, 2450, 1380),
-        (2500, 570, 3450, 1380),
-        (3550, 570, 4500, 1380),
-        (4600, 570, 5500, 1380),
-        (500, 1750, 1450, 2560),
-        (1550, 1750, 2450, 2560),
-        (2500, 1750, 3450, 2560),
-        (3550, 1750, 4500, 2560),
-        (4600, 1750, 5500, 2560),
-               ]
-    
-    sprite_splitter(sprite_sheet_path, crop_zones, transparent_color=(255, 255, 255), show=True)
+    crop_zones, transparent_color = SHEETS[sprite_sheet_path]
+    sprite_splitter(sprite_sheet_path, crop_zones, transparent_color=transparent_color, show=True)
 
 if __name__ == '__main__':
-    viking()
\ No newline at end of file
+    viking()
@@ -0,0 +1,364 @@
+"""Tests for asset loading: the shared frame store."""
+from __future__ import annotations
+
+import os
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _pygame_init():
+    pygame.init()
+    pygame.display.set_mode((100, 100))
+    yield
+    pygame.quit()
+
+
+def _surface(w, h):
+    return pygame.Surface((w, h), pygame.SRCALPHA)
+
+
+def test_frame_cache_counts_hits_and_misses():
+    from main import FrameCache
+
+    cache = FrameCache()
+    built = []
+
+    def factory():
+        built.append(True)
+        return _surface(4, 4)
+
+    first = cache.get(("a", 0, (4, 4)), factory)
+    second = cache.get(("a", 0, (4, 4)), factory)
+
+    assert first is second
+    assert len(built) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_frame_cache_evicts_least_recently_used():
+    from main import FrameCache
+
+    frame_bytes = FrameCache.surface_nbytes(_surface(10, 10))
+    cache = FrameCache(budget_bytes=2 * frame_bytes)
+    cache.get("a", lambda: _surface(10, 10))
+    cache.get("b", lambda: _surface(10, 10))
+    cache.get("a", lambda: _surface(10, 10))  # refresh "a"
+    cache.get("c", lambda: _surface(10, 10))  # over budget → drop "b"
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.evictions == 1
+    assert cache.nbytes == 2 * frame_bytes
+
+
+def test_sprites_with_same_source_share_frames():
+    from main import FRAMES, General
+
+    a = General(source="assets/sprites/viking", width=60, height=60)
+    misses = FRAMES.misses
+    b = General(source="assets/sprites/viking", width=60, height=60)
+
+    assert a.image is b.image
+    assert FRAMES.misses == misses
+
+
+def test_frame_size_is_part_of_the_key():
+    from main import General
+
+    small = General(source="assets/sprites/viking", width=30, height=30)
+    large = General(source="assets/sprites/viking", width=90, height=90)
+
+    assert small.image is not large.image
+    assert small.image.get_width() < large.image.get_width()
+
+
+def _touch_frames(directory, stem, n):
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(n):
+        (directory / f"{stem}_{i:02d}.png").write_bytes(b"")
+
+
+def test_catalogue_indexes_each_directory_once(tmp_path):
+    from main import AssetCatalogue
+
+    _touch_frames(tmp_path / "sprites" / "golem", "golem", 3)
+    _touch_frames(tmp_path / "sprites" / "viking", "viking", 2)
+    (tmp_path / "sprites" / "golem" / "golem.gif").write_bytes(b"")
+    catalogue = AssetCatalogue(root=tmp_path)
+
+    golem = catalogue.frames(tmp_path / "sprites" / "golem")
+
+    assert [p.name for p in golem] == ["golem_00.png", "golem_01.png", "golem_02.png"]
+    # Parent directories see every frame below them, like rglob did.
+    assert catalogue.count(tmp_path / "sprites") == 5
+
+
+def test_catalogue_manifest_round_trip(tmp_path):
+    from main import AssetCatalogue
+
+    _touch_frames(tmp_path / "effects" / "fire", "fire", 4)
+    manifest = AssetCatalogue(root=tmp_path).write_manifest()
+    # Files deleted after the manifest was written are still listed: the
+    # manifest, not the filesystem, is the source of truth.
+    (tmp_path / "effects" / "fire" / "fire_03.png").unlink()
+
+    catalogue = AssetCatalogue(root=tmp_path, manifest=manifest)
+
+    assert catalogue.count(tmp_path / "effects" / "fire") == 4
+
+
+def test_catalogue_watch_mode_picks_up_new_frames(tmp_path):
+    from main import AssetCatalogue
+
+    fire = tmp_path / "effects" / "fire"
+    _touch_frames(fire, "fire", 2)
+    catalogue = AssetCatalogue(root=tmp_path, watch=True, watch_interval=0)
+    assert catalogue.count(fire) == 2
+
+    (fire / "fire_02.png").write_bytes(b"")
+    os.utime(fire, ns=(0, 0))  # force a visible mtime change on coarse filesystems
+
+    assert catalogue.count(fire) == 3
+
+
+def test_catalogue_matches_rglob_for_repo_assets():
+    from pathlib import Path
+
+    from main import CATALOGUE
+
+    source = Path("assets/sprites/golem")
+
+    assert list(CATALOGUE.frames(source)) == sorted(source.rglob("*_[0-9][0-9].png"))
+
+
+def _write_frames(directory, stem, sizes):
+    from PIL import Image
+
+    directory.mkdir(parents=True, exist_ok=True)
+    for i, (w, h) in enumerate(sizes):
+        pixels = bytes((i * 40 + x) % 256 for x in range(w * h * 4))
+        Image.frombytes("RGBA", (w, h), pixels).save(directory / f"{stem}_{i:02d}.png")
+
+
+def test_atlas_serves_packed_frames_as_subsurfaces(tmp_path):
+    from main import AssetCatalogue, TextureAtlas, load_image_compat
+
+    _write_frames(tmp_path / "sprites" / "golem", "golem", [(12, 20), (9, 7), (15, 15)])
+    _write_frames(tmp_path / "effects" / "fire", "fire", [(5, 30), (6, 25)])
+    _write_frames(tmp_path / "level", "level", [(40, 20)])
+    atlas = TextureAtlas(root=tmp_path)
+
+    atlas.pack(AssetCatalogue(root=tmp_path))
+
+    # One page per source; the level background stays a plain file.
+    assert len(list(tmp_path.glob("atlas-*.png"))) == 2
+    assert atlas.frame(tmp_path / "level" / "level_00.png") is None
+    for path in AssetCatalogue(root=tmp_path).frames(tmp_path):
+        if path.parent.name == "level":
+            continue
+        frame = atlas.frame(path)
+        assert frame.get_parent() is not None
+        expected = load_image_compat(path).convert_alpha()
+        assert pygame.image.tobytes(frame, "RGBA") == pygame.image.tobytes(
+            expected, "RGBA"
+        )
+    atlas.enabled = False
+    assert atlas.frame(tmp_path / "effects" / "fire" / "fire_00.png") is None
+
+
+def test_atlas_skips_frames_changed_after_packing(tmp_path):
+    from main import AssetCatalogue, TextureAtlas, load_frame
+
+    source = tmp_path / "sprites" / "golem"
+    _write_frames(source, "golem", [(12, 20), (9, 7), (15, 15)])
+    TextureAtlas(root=tmp_path).pack(AssetCatalogue(root=tmp_path))
+    edited, removed, kept = (source / f"golem_{i:02d}.png" for i in range(3))
+    _write_frames(tmp_path / "new", "golem", [(6, 6)])
+    (tmp_path / "new" / "golem_00.png").replace(edited)
+    later = kept.stat().st_mtime_ns + 10**9
+    os.utime(edited, ns=(later, later))
+    removed.unlink()
+
+    atlas = TextureAtlas(root=tmp_path)
+
+    assert atlas.frame(edited) is None
+    assert atlas.frame(removed) is None
+    assert atlas.frame(kept).get_parent() is not None
+    assert load_frame(edited).get_size() == (6, 6)
+
+
+def test_sprites_draw_the_same_frames_from_the_atlas(tmp_path, monkeypatch):
+    import main
+
+    source = tmp_path / "sprites" / "viking"
+    _write_frames(source, "viking", [(30, 40), (28, 41), (31, 39)])
+    monkeypatch.setattr(main, "CATALOGUE", main.AssetCatalogue(root=tmp_path))
+    plain = [main.General(source=source, width=20, height=20).get_image_n(n) for n in range(3)]
+    main.FRAMES.clear()
+
+    atlas = main.TextureAtlas(root=tmp_path)
+    atlas.pack(main.CATALOGUE)
+    monkeypatch.setattr(main, "ATLAS", atlas)
+    packed = [main.General(source=source, width=20, height=20).get_image_n(n) for n in range(3)]
+    main.FRAMES.clear()
+
+    for a, b in zip(plain, packed):
+        assert a is not b
+        assert pygame.image.tobytes(a, "RGBA") == pygame.image.tobytes(b, "RGBA")
+
+
+def test_raw_frame_cache_round_trips_through_the_mapped_file(tmp_path):
+    from main import RawFrameCache
+
+    frame = _surface(7, 5)
+    frame.fill((10, 20, 30, 40))
+    cache = RawFrameCache(tmp_path, enabled=True)
+    cache.put("k@7x5", frame)
+    cache.flush()
+
+    loaded = RawFrameCache(tmp_path, enabled=True).get("k@7x5")
+
+    assert loaded.get_size() == (7, 5)
+    assert pygame.image.tobytes(loaded, "RGBA") == pygame.image.tobytes(frame, "RGBA")
+    assert RawFrameCache(tmp_path).get("other@7x5") is None
+
+
+def test_raw_frame_cache_keeps_display_format_frames_as_they_are(tmp_path):
+    from main import RawFrameCache
+
+    frame = _surface(6, 4).convert_alpha()
+    frame.fill((200, 100, 50, 25))
+    cache = RawFrameCache(tmp_path, enabled=True)
+    cache.put("k@6x4", frame)
+    cache.flush()
+
+    loaded = RawFrameCache(tmp_path, enabled=True).get("k@6x4")
+
+    # Stored in the display's byte order: usable without convert_alpha.
+    assert RawFrameCache.is_display_format(loaded)
+    assert pygame.image.tobytes(loaded, "RGBA") == pygame.image.tobytes(frame, "RGBA")
+
+
+def test_raw_frame_caches_sharing_a_directory_keep_each_others_frames(tmp_path):
+    from main import RawFrameCache
+
+    first, second = RawFrameCache(tmp_path, enabled=True), RawFrameCache(tmp_path, enabled=True)
+    frames = {}
+    for i, cache in enumerate([first, second, first, second]):
+        frames[f"k{i}@3x3"] = frame = _surface(3, 3)
+        frame.fill((i * 50, 10, 20, 255))
+        cache.put(f"k{i}@3x3", frame)
+    first.flush()
+    second.flush()
+
+    reader = RawFrameCache(tmp_path, enabled=True)
+    for key, frame in frames.items():
+        loaded = reader.get(key)
+        assert pygame.image.tobytes(loaded, "RGBA") == pygame.image.tobytes(frame, "RGBA")
+
+
+def test_raw_frame_cache_misses_once_a_source_changes(tmp_path, monkeypatch):
+    import main
+
+    source = tmp_path / "sprites" / "golem"
+    _write_frames(source, "golem", [(20, 30), (22, 28)])
+    monkeypatch.setattr(main, "CATALOGUE", main.AssetCatalogue(root=tmp_path))
+    monkeypatch.setattr(main, "RAW_FRAMES", main.RawFrameCache(tmp_path / ".cache", enabled=True))
+
+    def frames():
+        main.FRAMES.clear()
+        sprite = main.General(source=source, width=20, height=20)
+        return [pygame.image.tobytes(sprite.get_image_n(n), "RGBA") for n in range(2)]
+
+    decoded = frames()
+    cached_entries = len(main.RAW_FRAMES._frames)
+    assert frames() == decoded
+    assert len(main.RAW_FRAMES._frames) == cached_entries == 2
+
+    _write_frames(source, "golem", [(20, 30), (25, 25)])  # frame 1 redrawn
+    os.utime(source / "golem_01.png", ns=(1, 1))
+
+    changed = frames()
+    assert changed[0] == decoded[0]
+    assert changed[1] != decoded[1]
+    assert len(main.RAW_FRAMES._frames) == 3
+    main.RAW_FRAMES.flush()
+    main.FRAMES.clear()
+
+
+def test_preloader_warms_the_frames_a_sprite_will_draw(tmp_path, monkeypatch):
+    import main
+
+    source = tmp_path / "sprites" / "golem"
+    _write_frames(source, "golem", [(30, 40), (28, 41), (31, 39), (29, 40)])
+    monkeypatch.setattr(main, "CATALOGUE", main.AssetCatalogue(root=tmp_path))
+    main.FRAMES.clear()
+
+    preloader = main.Preloader([(source, (20, 20), [2, 3])])
+    assert (preloader.total, preloader.progress) == (3, 0.0)  # frame 0 too
+    preloader.start().wait()
+
+    assert preloader.finished and preloader.progress == 1.0
+    assert not main._DECODED
+    misses = main.FRAMES.misses
+    sprite = main.General(source=source, width=20, height=20)
+    warmed = [sprite.get_image_n(n) for n in (0, 2, 3)]
+    assert main.FRAMES.misses == misses
+
+    main.FRAMES.clear()
+    for n, frame in zip((0, 2, 3), warmed):
+        fresh = main.General(source=source, width=20, height=20).get_image_n(n)
+        assert pygame.image.tobytes(fresh, "RGBA") == pygame.image.tobytes(frame, "RGBA")
+    main.FRAMES.clear()
+
+
+def test_preloader_reports_a_frame_it_cannot_decode(tmp_path, monkeypatch):
+    import main
+
+    source = tmp_path / "sprites" / "golem"
+    _write_frames(source, "golem", [(30, 40), (28, 41)])
+    (source / "golem_01.png").write_bytes(b"not a png")
+    monkeypatch.setattr(main, "CATALOGUE", main.AssetCatalogue(root=tmp_path))
+    main.FRAMES.clear()
+
+    preloader = main.Preloader([(source, (20, 20), [1])])
+    with pytest.raises(RuntimeError, match="golem_01.png") as failure:
+        preloader.start().wait()
+    assert failure.value.__cause__ is not None
+    assert not preloader.finished
+    assert not main._DECODED  # golem_00 decoded fine, but is not kept
+
+    # The loading screen gives up too instead of spinning on its bar.
+    game = main.Game(source="assets/level", preload=False)
+    game.preloader = main.Preloader([(source, (20, 20), [1])]).start()
+    with pytest.raises(RuntimeError):
+        game.loading_screen()
+    main.FRAMES.clear()
+
+
+def test_reset_drops_frames_the_old_preloader_decoded():
+    import main
+
+    game = main.Game(source="assets/level")
+    game.preloader._thread.join()
+    game.preloader.pump(budget=0)  # decoded, not yet warmed
+    assert main._DECODED
+
+    game.cleanup()
+
+    assert not main._DECODED
+    game.preloader.close()
+
+
+def test_level_requirements_cover_wave_enemies():
+    from main import Golem, Simulation, Viking
+
+    sources = {source for source, _, _ in Simulation().frame_requirements()}
+
+    assert {Golem.source, Viking.source} <= sources
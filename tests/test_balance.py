@@ -0,0 +1,100 @@
+"""Tests for the Monte Carlo balancing runner (balance.py)."""
+from __future__ import annotations
+
+import balance
+import main
+
+SPEC = {
+    "params": {
+        "Tower.DAMAGE_BY_RANK": [[10, 20, 35], [40, 60, 80]],
+        "Arrow.enemy_modifiers": [{"Viking": 1.3, "Golem": 0.8}],
+        "Simulation.WAVES": ["assets/waves.json"],
+    },
+    "placements": {
+        "start": [[0, "tower", 300, 300], [1, "upgrade", 300, 300]],
+        "none": [],
+    },
+    "seeds": 2,
+    "jitter": 10,
+    "max_seconds": 20,
+    "sample_every": 5,
+}
+
+
+def test_expand_covers_grid_placements_and_seeds():
+    configs, placements, jobs = balance.expand(SPEC)
+
+    assert len(configs) == 2
+    assert placements == ["none", "start"]
+    assert len(jobs) == 2 * 2 * 2
+
+
+def test_play_restores_overridden_attributes():
+    damage, modifiers = main.Tower.DAMAGE_BY_RANK, main.Arrow.enemy_modifiers
+    _, _, jobs = balance.expand(SPEC)
+
+    first = balance.play(jobs[-1])
+
+    assert main.Tower.DAMAGE_BY_RANK is damage
+    assert main.Arrow.enemy_modifiers is modifiers
+    assert main.Simulation.WAVES == main.Path("assets/waves.json")
+    assert first["towers"] == 1
+    assert first["gold"][0] == 200 - main.Tower.PRICE
+    # Same seed, same jittered layout, same game.
+    again = balance.play(jobs[-1])
+    assert (again["gold"] == first["gold"]).all()
+
+
+def test_run_streams_columns(tmp_path):
+    rows = balance.run(SPEC, tmp_path / "out", workers=2)
+
+    columns = balance.load_results(tmp_path / "out")
+    assert rows == 8
+    assert sorted(columns["config"]) == [0] * 4 + [1] * 4
+    assert columns["gold"].shape == (8, 5)
+    assert all(len(values) == 8 for values in columns.values())
+    assert set(columns["placement"]) == {0, 1}
+
+
+def test_load_results_keeps_only_complete_rows(tmp_path):
+    import json
+
+    import numpy as np
+
+    row = {name: 1 for name in balance.COLUMNS} | {"gold": np.arange(4, dtype=np.int32)}
+    writer = balance.ResultWriter(tmp_path, [{}], ["none"], 4)
+    for _ in range(3):
+        writer.append(row)
+    writer.close()
+    with (tmp_path / "seed.bin").open("ab") as fh:  # a row cut short
+        fh.write(np.int32(7).tobytes())
+
+    columns = balance.load_results(tmp_path)
+    assert all(len(values) == 3 for values in columns.values())
+
+    # Killed before close: no row count, so keep what every column holds.
+    schema = json.loads((tmp_path / "schema.json").read_text())
+    del schema["rows"]
+    (tmp_path / "schema.json").write_text(json.dumps(schema))
+    gold = tmp_path / "gold.bin"
+    gold.write_bytes(gold.read_bytes()[: 2 * 16 + 6])
+
+    columns = balance.load_results(tmp_path)
+    assert all(len(values) == 2 for values in columns.values())
+    assert columns["gold"].tolist() == [[0, 1, 2, 3]] * 2
+
+
+def test_overriding_an_inherited_attribute_leaves_no_copy_behind():
+    with balance.overridden({"Viking._layer": 11, "Viking.GOLD_REWARD": 99}):
+        assert main.Viking._layer == 11
+
+    assert "_layer" not in vars(main.Viking)
+    assert main.Viking._layer == main.Golem._layer
+    assert main.Viking.GOLD_REWARD == 10
+
+
+def test_sample_interval_must_cover_a_tick():
+    import pytest
+
+    with pytest.raises(ValueError, match="sample_every"):
+        balance.expand(SPEC | {"sample_every": 0.001})
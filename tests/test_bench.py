@@ -0,0 +1,62 @@
+"""Tests for the benchmark harness helpers (bench.py)."""
+from __future__ import annotations
+
+import json
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+
+def test_percentile_nearest_rank():
+    from bench import percentile
+
+    samples = list(range(1, 101))
+
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+
+
+def test_regressions_flag_slower_runs_only():
+    from bench import regressions
+
+    baseline = {"towers": {"ticks_per_sec": 1000, "p99_ms": 2.0}}
+    ok = {"towers": {"ticks_per_sec": 900, "p99_ms": 2.2}}
+    slow = {"towers": {"ticks_per_sec": 700, "p99_ms": 3.0}}
+    new = {"other": {"ticks_per_sec": 1, "p99_ms": 99}}
+
+    assert regressions(ok, baseline, tolerance=0.2) == []
+    assert len(regressions(slow, baseline, tolerance=0.2)) == 2
+    assert regressions(new, baseline) == []
+
+
+def test_run_scenario_reports_metrics(monkeypatch, tmp_path):
+    import bench
+
+    monkeypatch.setitem(
+        bench.SCENARIOS, "tiny", (bench._sim_scenario(2, 10), "smoke")
+    )
+    out = tmp_path / "results.json"
+
+    code = bench.main_cli(
+        ["--scenario", "tiny", "--ticks", "20", "--out", str(out)]
+    )
+
+    assert code == 0
+    result = json.loads(out.read_text())["tiny"]
+    assert result["ticks"] == 20
+    assert result["ticks_per_sec"] > 0
+    assert result["p99_ms"] >= result["p50_ms"] > 0
+
+
+def test_import_report_lists_main_and_its_direct_imports():
+    from bench import import_report
+
+    rows = import_report(runs=1)
+    names = [name for name, _, _ in rows]
+
+    assert names[0] == "main"
+    assert "numpy" in names and "pygame" in names
+    # Only needed on fallback / tooling paths, so not imported up front.
+    assert not {"PIL", "PIL.Image", "hashlib", "argparse"} & set(names)
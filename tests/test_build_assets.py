@@ -0,0 +1,64 @@
+"""Tests for the batch asset build (build_assets.py)."""
+from __future__ import annotations
+
+import os
+
+import numpy as np
+from PIL import Image
+
+import build_assets
+from sheet2pngs import make_transparent, strip_frame
+
+KEY = (255, 255, 255)
+
+
+def _sheet(tmp_path):
+    """A white sheet with three coloured blobs, one per crop zone."""
+    sheet_dir = tmp_path / "blob"
+    sheet_dir.mkdir()
+    array = np.full((60, 150, 3), 255, dtype=np.uint8)
+    for i, color in enumerate([(200, 0, 0), (0, 200, 0), (0, 0, 200)]):
+        array[15:45, 50 * i + 10 : 50 * i + 35 + i * 5] = color
+    path = sheet_dir / "blob_sheet.png"
+    Image.fromarray(array).save(path)
+    zones = [(50 * i, 0, 50 * i + 50, 60) for i in range(3)]
+    return path, zones
+
+
+def test_build_matches_sequential_pipeline_and_skips_fresh_frames(tmp_path):
+    path, zones = _sheet(tmp_path)
+
+    written = build_assets.build(build_assets.sheet_jobs(path, zones, KEY), workers=2)
+
+    assert [p.name for p in written] == ["blob_00.png", "blob_01.png", "blob_02.png"]
+    sheet = Image.open(path).convert("RGBA")
+    for out, zone in zip(written, zones):
+        expected = strip_frame(make_transparent(sheet.crop(zone), transparent_color=KEY))
+        assert np.array_equal(np.array(Image.open(out)), np.array(expected))
+    assert not list(path.parent.glob(".*.tmp"))
+
+    # Outputs are newer than the sheet: nothing left to do...
+    assert list(build_assets.sheet_jobs(path, zones, KEY)) == []
+    # ...until the sheet is touched, and then only stale zones are redone.
+    stamp = path.stat().st_mtime + 10
+    os.utime(path, (stamp, stamp))
+    os.utime(written[1], (stamp + 1, stamp + 1))
+    stale = [job[2].name for job in build_assets.sheet_jobs(path, zones, KEY)]
+    assert stale == ["blob_00.png", "blob_02.png"]
+    assert len(list(build_assets.sheet_jobs(path, zones, KEY, force=True))) == 3
+
+
+def test_gif_jobs_crop_every_frame(tmp_path):
+    gif_dir = tmp_path / "anim"
+    gif_dir.mkdir()
+    frames = [
+        Image.fromarray(np.full((20, 30, 3), value, dtype=np.uint8))
+        for value in (10, 20, 30)
+    ]
+    gif = gif_dir / "anim.gif"
+    frames[0].save(gif, save_all=True, append_images=frames[1:])
+
+    jobs = list(build_assets.gif_jobs(gif, (5, 5, 25, 15), (222, 222, 222)))
+
+    assert [job[2].name for job in jobs] == ["anim_00.png", "anim_01.png", "anim_02.png"]
+    assert all(job[0].size == (20, 10) and job[0].mode == "RGBA" for job in jobs)
@@ -129,3 +129,98 @@ def test_character_take_damage_kills_at_zero_and_awards_gold():
     assert killed == [True]
     assert parent.money == 7
     assert any("died" in line for line in parent.stats.log)
+
+
+def test_rotation_atlas_picks_nearest_baked_angle():
+    from main import RotationAtlas
+
+    sprite = pygame.Surface((20, 4), pygame.SRCALPHA)
+    atlas = RotationAtlas(sprite, steps=8)
+
+    assert atlas.frame(1, 0) is atlas.frames[0]
+    assert atlas.frame(0, 1) is atlas.frames[2]  # +y is down on screen
+    assert atlas.frame(-1, 0.1) is atlas.frames[4]
+    # A vertical frame is tall and thin.
+    assert atlas.frames[2].get_height() > atlas.frames[2].get_width()
+
+
+def test_rotation_atlas_is_shared_per_factory_and_resolution():
+    from main import RotationAtlas, _arrow_surface
+
+    assert RotationAtlas.shared(_arrow_surface, 16) is RotationAtlas.shared(
+        _arrow_surface, 16
+    )
+    assert RotationAtlas.shared(_arrow_surface, 16) is not RotationAtlas.shared(
+        _arrow_surface, 32
+    )
+
+
+def test_arrow_renders_from_the_shared_atlas():
+    from main import Arrow, RotationAtlas
+
+    arrow = Arrow.__new__(Arrow)
+    arrow._velocity = [0.0, -50.0]
+
+    arrow._render()
+
+    atlas = RotationAtlas.shared(Arrow.rotation_sprite, Arrow.rotation_steps)
+    assert arrow.image is atlas.frames[3 * Arrow.rotation_steps // 4]
+
+
+class _FakeWorld:
+    """Just enough of a Simulation for Bullet.reset / kill."""
+
+    def __init__(self, cap=4):
+        from main import ProjectilePool
+
+        self.bullet_pool = ProjectilePool(cap)
+        self.group = pygame.sprite.Group()
+
+
+def test_projectile_pool_recycles_killed_bullets():
+    from main import Arrow
+
+    world = _FakeWorld()
+    first = world.bullet_pool.acquire(Arrow, pos=(0, 0), target=None, parent=world)
+    first._hit.add(123)
+    world.group.add(first)
+    first.kill()
+
+    second = world.bullet_pool.acquire(
+        Arrow, pos=(10, 20), target=None, parent=world, damage=35
+    )
+
+    assert second is first
+    assert second.pos == [10.0, 20.0]
+    assert second._hit == set()
+    assert second.damage == 35
+    assert (world.bullet_pool.created, world.bullet_pool.reused) == (1, 1)
+
+
+def test_projectile_pool_respects_cap_and_ignores_double_kill():
+    from main import Arrow
+
+    world = _FakeWorld(cap=1)
+    bullets = [
+        world.bullet_pool.acquire(Arrow, pos=(0, 0), target=None, parent=world)
+        for _ in range(3)
+    ]
+    world.group.add(*bullets)
+    for b in bullets:
+        b.kill()
+    bullets[0].kill()  # already dead: must not be parked twice
+
+    assert len(world.bullet_pool._free[Arrow]) == 1
+
+
+def test_reused_bullet_falls_back_to_class_damage():
+    from main import Arrow
+
+    world = _FakeWorld()
+    b = world.bullet_pool.acquire(Arrow, pos=(0, 0), target=None, parent=world, damage=99)
+    world.group.add(b)
+    b.kill()
+
+    again = world.bullet_pool.acquire(Arrow, pos=(0, 0), target=None, parent=world)
+
+    assert again.damage == Arrow.damage
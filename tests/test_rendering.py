@@ -0,0 +1,282 @@
+"""Tests for Game's rendering paths (headless dummy display)."""
+from __future__ import annotations
+
+import os
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _pygame_init():
+    pygame.init()
+    pygame.font.init()
+    yield
+    pygame.quit()
+
+
+def _full_frame(game) -> bytes:
+    """What a full repaint of the current state looks like."""
+    screen = game.screen
+    reference = screen.copy()
+    reference.blit(game.background, (0, 0))
+    for group in (game.sim.all_sprites, game.ui_sprites):
+        for sprite in group.sprites():
+            reference.blit(sprite.image, sprite.rect)
+    game.screen = reference
+    try:
+        game._draw_range_overlay()
+        game._draw_health_bars()
+    finally:
+        game.screen = screen
+    return pygame.image.tobytes(reference, "RGB")
+
+
+def test_dirty_rect_render_matches_full_repaint():
+    from main import Game
+
+    game = Game(source="assets/level", dirty_rects=True)
+    game.sim.money = 1000
+    tower = game.sim.spawn_tower((300, 300))
+    game.mouse_hover(pygame.event.Event(pygame.MOUSEMOTION, pos=tower.rect.center))
+
+    for frame in range(240):
+        game.update(1 / 60)
+        game.render()
+        if frame == 150:
+            tower.upgrade()  # taller sprite: old and new areas both dirty
+            game.mouse_hover(pygame.event.Event(pygame.MOUSEMOTION, pos=(5, 5)))
+
+    assert len(game.sim.all_enemies) > 0
+    assert pygame.image.tobytes(game.screen, "RGB") == _full_frame(game)
+
+
+def test_hud_recomposites_only_when_inputs_change(monkeypatch):
+    import main
+
+    game = main.Game(source="assets/level")
+    calls = []
+    real = main.render_text
+    monkeypatch.setattr(
+        main, "render_text", lambda *a: calls.append(a[1]) or real(*a)
+    )
+
+    game.stats.update()
+    drawn = len(calls)
+    game.stats.update()  # nothing changed
+    assert len(calls) == drawn
+
+    for _ in range(20):  # the clock moves, but not by a whole second
+        game.sim.step()
+        game.stats.update()
+    assert len(calls) == drawn
+
+    game.sim.money += 5
+    game.stats.update()
+    assert f"Money: {game.sim.money}" in calls[drawn:]
+
+
+def test_text_cache_reuses_rendered_lines():
+    import main
+
+    font = pygame.font.Font(None, 20)
+    first = main.render_text(font, "Wave: 1 / 4", (255, 255, 255))
+
+    assert main.render_text(font, "Wave: 1 / 4", (255, 255, 255)) is first
+    assert main.render_text(font, "Wave: 1 / 4", (255, 0, 0)) is not first
+
+
+def test_profiler_times_stages_and_dumps(monkeypatch, tmp_path):
+    import csv
+    import json
+
+    import main
+
+    profiler = main.FrameProfiler(window=50)
+    monkeypatch.setattr(main, "PROFILER", profiler)
+    game = main.Game(source="assets/level")
+
+    game.update(1 / 60)
+    game.render()
+    assert profiler.sections == {}  # disabled: nothing recorded
+
+    game.handle_event(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_F3))
+    for _ in range(60):
+        game.update(1 / 60)
+        game.render()
+
+    report = profiler.summary()
+    for stage in ("enemies", "sprites", "waves", "hud", "draw", "overlays", "flip"):
+        assert report[stage]["count"] == 50  # rolling window
+        assert sum(report[stage]["histogram"]) == 50
+        assert report[stage]["p50_ms"] <= report[stage]["p99_ms"] <= report[stage]["max_ms"]
+    assert game._draw_profile_overlay() is not None
+
+    data = json.loads(profiler.dump(tmp_path / "stages.json").read_text())
+    assert data["stages"]["draw"]["count"] == 50
+    with profiler.dump(tmp_path / "stages.csv").open() as fh:
+        rows = {row["stage"]: row for row in csv.DictReader(fh)}
+    assert rows["flip"]["count"] == "50"
+
+
+def _outcome(sim):
+    enemies = sorted((type(e).__name__, e.rect.topleft, e.hp) for e in sim.all_enemies)
+    return sim.tick, sim.money, sim.health, sim.wave_number, enemies
+
+
+def _towers(sim):
+    for pos in [(300, 300), (700, 300), (1100, 300)]:
+        sim.spawn_tower(pos)
+
+
+@pytest.mark.parametrize("speed", [2, 4])
+def test_fast_forward_steps_like_real_time(speed):
+    from main import Game, Simulation
+
+    game = Game(source="assets/level", preload=False, speed=speed)
+    _towers(game.sim)
+    for _ in range(600 // speed):
+        game.update(1 / 60)
+    reference = Simulation()
+    _towers(reference)
+    while reference.tick < game.sim.tick:
+        reference.step()
+
+    assert game.sim.tick >= 590
+    assert _outcome(game.sim) == _outcome(reference)
+
+
+def test_max_speed_plays_to_the_end_like_a_headless_run():
+    from main import Game, Simulation
+
+    game = Game(source="assets/level", preload=False, speed=0)
+    _towers(game.sim)
+    frames = 0
+    while not game.sim.finished:
+        game.update(1 / 60)
+        game.render()
+        frames += 1
+    reference = Simulation()
+    _towers(reference)
+    reference.run()
+
+    assert _outcome(game.sim) == _outcome(reference)
+    # Only one frame drawn per MAX_SPEED_SLICE, not one per step.
+    assert frames < game.sim.tick / 10
+
+
+def test_speed_key_cycles_speeds(monkeypatch):
+    import main
+
+    game = main.Game(source="assets/level", preload=False)
+    press = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_f)
+    labels = []
+    real = main.render_text
+    monkeypatch.setattr(
+        main, "render_text", lambda *a: labels.append(a[1]) or real(*a)
+    )
+
+    seen = [game.speed]
+    for _ in game.SPEEDS:
+        game.handle_event(press)
+        seen.append(game.speed)
+        game.stats.update()
+
+    assert seen == [1, 2, 4, 0, 1]
+    assert [label for label in labels if label.startswith("Speed")] == [
+        "Speed: 2x", "Speed: 4x", "Speed: max", "Speed: 1x",
+    ]
+
+    game.speed = 3  # not one of SPEEDS: on to the next faster one
+    game.handle_event(press)
+    assert game.speed == 4
+
+
+def _play_session(game):
+    """Clicks and keys spread over a few hundred frames, including a pause."""
+    def key(k):
+        return pygame.event.Event(pygame.KEYDOWN, key=k)
+
+    def click(button, pos):
+        return pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=button, pos=pos)
+
+    script = {
+        0: [click(1, (300, 300))],
+        40: [key(pygame.K_m), click(1, (700, 300))],
+        90: [key(pygame.K_p)],
+        120: [click(1, (900, 300)), key(pygame.K_p)],  # ignored while paused
+        150: [click(3, (300, 300)), key(pygame.K_h)],
+        400: [click(1, (1100, 300))],
+    }
+    for frame in range(900):
+        for event in script.get(frame, []):
+            game.handle_event(event)
+        game.update(1 / 60)
+    game.recording.end_tick = game.sim.tick
+
+
+def test_recorded_session_replays_exactly(tmp_path):
+    from main import Game, InputLog
+
+    game = Game(source="assets/level", preload=False)
+    _play_session(game)
+    log = InputLog.load(game.recording.save(tmp_path / "session.tdin"))
+
+    assert [action for _, action, _, _ in log.entries] == [
+        "tower", "money", "tower", "pause", "pause", "upgrade", "heal", "tower"
+    ]
+    assert (tmp_path / "session.tdin").stat().st_size == 16 + 9 * len(log)
+    assert _outcome(log.replay()) == _outcome(game.sim)
+
+    replayed = Game(source="assets/level", preload=False, speed=0, replay=log)
+    while not replayed.replay_done:
+        replayed.update(1 / 60)
+    assert _outcome(replayed.sim) == _outcome(game.sim)
+
+
+def test_autosave_resumes_where_the_game_was(tmp_path):
+    from main import Game, Snapshot
+
+    path = tmp_path / "autosave.tdss"
+    game = Game(source="assets/level", preload=False, speed=4, autosave=path)
+    _towers(game.sim)
+    for _ in range(200):
+        game.update(1 / 60)
+    saved_at = game._autosaved
+    assert saved_at >= game.AUTOSAVE_SECONDS and path.exists()
+
+    resumed = Game(source="assets/level", preload=False)
+    resumed.update(1 / 120)  # half a step of lag left on the old world
+    resumed.resume(Snapshot.load(path))
+    resumed.update(1 / 120)
+    resumed.render()
+
+    assert resumed.sim.time == saved_at
+    assert len(resumed.sim.all_towers) == 3
+    assert resumed.sim.stats is resumed.stats
+    assert resumed.stats.sim is resumed.sim
+
+
+def test_replay_matches_live_play_across_a_reset_with_custom_money():
+    from main import Game, InputLog
+
+    log = InputLog(money=500)
+    game = Game(source="assets/level", preload=False, money=500, recording=log)
+    assert game.recording is log  # an empty log passed in is kept
+    game.apply("tower", (300, 300))
+    for _ in range(300):
+        game.update(1 / 60)
+    game.apply("reset")
+    assert game.sim.money == 500
+    for frame in range(400):
+        if frame == 50:
+            game.apply("tower", (700, 300))
+        game.update(1 / 60)
+    log.end_tick = game.sim.tick
+
+    assert [action for _, action, _, _ in log.entries] == ["tower", "reset", "tower"]
+    assert _outcome(InputLog.from_bytes(log.to_bytes()).replay()) == _outcome(game.sim)
@@ -0,0 +1,58 @@
+"""Golden tests: the vectorized make_transparent matches the original loop."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from sheet2pngs import make_transparent
+
+
+def _make_transparent_loop(frame, transparent_color=(222, 222, 222)):
+    """The original per-pixel implementation, kept as the reference."""
+    array = np.array(frame)
+    window_size = 2
+    for y in range(array.shape[0]):
+        for x in range(array.shape[1]):
+            win_xmin = max(0, x - window_size)
+            win_xmax = min(array.shape[1], x + window_size)
+            win_ymin = max(0, y - window_size)
+            win_ymax = min(array.shape[0], y + window_size)
+            R = array[win_ymin:win_ymax, win_xmin:win_xmax, 0]
+            G = array[win_ymin:win_ymax, win_xmin:win_xmax, 1]
+            B = array[win_ymin:win_ymax, win_xmin:win_xmax, 2]
+            if transparent_color[0] in R and transparent_color[1] in G and transparent_color[2] in B:
+                array[y, x, :] = [255, 255, (transparent_color[2] + 1) % 255, 0]
+    return Image.fromarray(array)
+
+
+def _assert_same(frame, color):
+    expected = np.array(_make_transparent_loop(frame, color))
+    assert np.array_equal(np.array(make_transparent(frame, color)), expected)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_loop_on_random_frames(seed):
+    # Few distinct values, including the key and the keyed-out pixel value,
+    # so partial matches and in-place rewrites show up everywhere.
+    rng = np.random.default_rng(seed)
+    color = tuple(int(v) for v in rng.choice([0, 1, 254, 255], 3))
+    values = sorted({0, 1, 255, (color[2] + 1) % 255, *color})
+    h, w = rng.integers(1, 16, 2)
+    frame = Image.fromarray(rng.choice(values, (h, w, 4)).astype(np.uint8), "RGBA")
+
+    _assert_same(frame, color)
+
+
+def test_matches_loop_on_golem_gif_frame():
+    with Image.open("assets/sprites/golem/golem.gif") as gif:
+        frame = gif.convert("RGBA").crop((250, 150, 350, 230))
+
+    _assert_same(frame, (222, 222, 222))
+
+
+def test_matches_loop_on_viking_sheet_crop():
+    with Image.open("assets/sprites/viking/viking_sheet.jpg") as sheet:
+        frame = sheet.convert("RGBA").crop((600, 870, 700, 950))
+
+    _assert_same(frame, (255, 255, 255))
@@ -0,0 +1,392 @@
+"""Tests for the headless, fixed-timestep Simulation."""
+from __future__ import annotations
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+
+def _state(sim):
+    enemies = sorted((type(e).__name__, e.rect.topleft, e.hp) for e in sim.all_enemies)
+    return sim.tick, sim.money, sim.health, sim.wave_number, enemies
+
+
+def test_step_advances_fixed_dt_without_a_display():
+    from main import Simulation
+
+    sim = Simulation(tick_rate=50)
+    for _ in range(10):
+        sim.step()
+
+    assert sim.tick == 10
+    assert abs(sim.time - 0.2) < 1e-9
+    assert pygame.display.get_surface() is None
+
+
+def test_first_enemy_spawns_after_grace_period():
+    from main import Simulation
+
+    sim = Simulation()
+    sim.run(max_seconds=sim.WAVE_FIRST_DELAY_MS / 1000)
+    assert len(sim.all_enemies) == 0
+
+    sim.run(max_seconds=sim.WAVE_FIRST_DELAY_MS / 1000 + 0.1)
+    assert len(sim.all_enemies) == 1
+
+
+def test_runs_are_deterministic():
+    from main import Simulation
+
+    def play():
+        sim = Simulation()
+        sim.spawn_tower((300, 300))
+        sim.spawn_tower((700, 300))
+        sim.run(max_seconds=20)
+        return _state(sim)
+
+    assert play() == play()
+
+
+def test_towers_kill_enemies_and_earn_gold():
+    from main import Simulation
+
+    sim = Simulation(money=1000)
+    for pos in [(300, 300), (500, 300), (700, 300)]:
+        sim.spawn_tower(pos)
+    money = sim.money
+
+    sim.run(max_seconds=30)
+
+    assert sim.money > money
+
+
+class _StubWalker:
+    """Just the attributes EnemyStore reads from an enemy sprite."""
+
+    _store = None
+    _slot = None
+
+    def __init__(self, route, size=(10, 10), hp=10, speed=60, progress=0.0):
+        self._rect = pygame.Rect((0, 0), size)
+        self.rect = self._rect
+        self.progress = progress
+        self.lane = 0
+        self.speed = speed
+        self.hp = hp
+        self.route = route
+
+
+def _l_route():
+    return iter([(5, 10), (105, 10), (105, 110)])
+
+
+def test_route_interpolates_by_arc_length():
+    from main import Route
+
+    route = Route(_l_route())
+
+    assert route.length == 200
+    assert route.position(0) == (5, 10)
+    assert route.position(150) == (105, 60)
+    assert route.position(10_000) == (105, 110)  # clamped to the end
+    assert route.positions([25, 125]).tolist() == [[30, 10], [105, 35]]
+
+
+def test_enemy_store_steps_every_enemy_along_its_route():
+    from main import EnemyStore
+
+    store = EnemyStore(capacity=1)  # forces a grow on the second add
+    a = _StubWalker(_l_route)
+    b = _StubWalker(_l_route, speed=240)
+    store.add(a)
+    store.add(b)
+    # The rect is placed on the route as soon as the enemy is added.
+    assert a.rect.topleft == (0, 0)
+
+    finished = store.step(0.5)
+
+    assert finished == []
+    assert a.rect.topleft == (30, 0)  # 30 px along the first leg
+    assert b.rect.topleft == (100, 20)  # 120 px: round the corner
+    assert len(store.routes) == 1
+
+
+def test_enemy_store_reports_enemies_at_the_end_of_the_route():
+    from main import EnemyStore
+
+    store = EnemyStore()
+    walker = _StubWalker(_l_route, progress=195)
+    store.add(walker)
+
+    assert store.step(0.1) == [walker]
+    assert walker.rect.topleft == (100, 100)
+
+
+def test_enemy_store_remove_keeps_rows_contiguous():
+    from main import EnemyStore
+
+    store = EnemyStore()
+    walkers = [_StubWalker(_l_route, hp=hp) for hp in (10, 20, 30)]
+    for w in walkers:
+        store.add(w)
+
+    store.remove(walkers[0])
+
+    assert len(store) == 2
+    assert walkers[2]._slot == 0
+    assert store.hp[:2].tolist() == [30, 20]
+    assert walkers[0]._store is None
+
+
+def test_character_hp_is_a_view_on_the_store():
+    from main import Simulation, Viking
+
+    sim = Simulation()
+    viking = Viking(parent=sim)
+    sim.add_enemy(viking)
+
+    viking.take_damage(15)
+
+    assert sim.enemies.hp[viking._slot] == Viking.MAX_HP - 15
+    viking.kill()
+    assert viking.hp == Viking.MAX_HP - 15
+    assert len(sim.enemies) == 0
+
+
+def test_towers_share_composited_images_per_look():
+    from main import Simulation
+
+    sim = Simulation(money=1000)
+    a = sim.spawn_tower((300, 300))
+    b = sim.spawn_tower((700, 300))
+    assert a.image is b.image
+
+    a.upgrade()
+
+    assert a.rank == 1
+    assert a.image is not b.image
+    assert abs(a.rect.centerx - 300) <= 1  # still anchored on its base
+    b.upgrade()
+    assert a.image is b.image
+
+
+def test_tower_tick_does_not_restack(monkeypatch):
+    from main import Simulation, Tower
+
+    sim = Simulation()
+    sim.spawn_tower((300, 300))
+    calls = []
+    monkeypatch.setattr(Tower, "stack_images", lambda self, ns: calls.append(ns))
+
+    sim.run(max_seconds=1)
+
+    assert calls == []
+
+
+class _Clock:
+    """Minimal Schedule parent: just a settable simulation time."""
+
+    time = 0.0
+
+
+def _schedule(clock, delay):
+    from main import Schedule
+
+    return Schedule(lambda **_: None, delay=delay, parent=clock)
+
+
+def test_scheduler_pops_in_due_order_only_when_ready():
+    from main import Scheduler
+
+    clock = _Clock()
+    scheduler = Scheduler()
+    late = scheduler.add(_schedule(clock, 300))
+    early = scheduler.add(_schedule(clock, 100))
+    assert len(scheduler) == 2
+
+    clock.time = 0.05
+    assert list(scheduler.pop_due()) == []
+
+    clock.time = 1.0
+    assert list(scheduler.pop_due()) == [early, late]
+    assert len(scheduler) == 0
+
+
+def test_scheduler_cancel_skips_entry():
+    from main import Scheduler
+
+    clock = _Clock()
+    scheduler = Scheduler()
+    keep = scheduler.add(_schedule(clock, 100))
+    drop = scheduler.add(_schedule(clock, 50))
+
+    assert scheduler.cancel(drop)
+    assert not scheduler.cancel(drop)
+    clock.time = 1.0
+
+    assert list(scheduler.pop_due()) == [keep]
+    assert not scheduler.cancel(keep)  # already delivered
+
+
+def test_cancelled_spawns_do_not_hold_back_the_next_wave():
+    from main import Simulation
+
+    sim = Simulation()
+    pending = [entry[2] for entry in sim.scheduler._heap]
+    for schedule in pending:
+        sim.cancel(schedule)
+
+    assert sim._wave_pending_spawns == 0
+    sim.run(max_seconds=(sim.WAVE_INTER_DELAY_MS + 100) / 1000)
+    assert sim.wave_number == 2
+
+
+def test_first_targeting_picks_enemy_furthest_along_route():
+    from main import Simulation, Viking
+
+    sim = Simulation()
+    behind, ahead = Viking(parent=sim), Viking(parent=sim)
+    for enemy, progress in ((behind, 300.0), (ahead, 360.0)):
+        sim.add_enemy(enemy)
+        enemy.progress = progress
+    sim.enemies.step(0)
+    sim._index_enemies()
+    centre = behind.rect.center
+
+    assert sim.first_enemy(centre, 200) is ahead
+    assert sim.nearest_enemy(centre, 200) is behind
+
+
+def _full_state(sim):
+    enemies = [
+        (type(e).__name__, e.rect.topleft, e.hp, e.progress, e._on_fire)
+        for e in sim.all_enemies
+    ]
+    bullets = [(tuple(b.pos), tuple(b._velocity), b.damage) for b in sim.all_bullets]
+    order = [type(s).__name__ for s in sim.all_sprites]
+    return _state(sim), enemies, bullets, order, len(sim.scheduler)
+
+
+def test_snapshot_restores_a_world_that_steps_identically(tmp_path):
+    from main import Effect, Simulation, Snapshot
+
+    sim = Simulation(money=1000)
+    for pos in [(300, 300), (700, 300), (1100, 300)]:
+        sim.spawn_tower(pos)
+    sim.upgrade_tower((300, 300))
+    sim.run(max_seconds=30)
+    # Mid-fight: arrows in the air and an enemy on fire.
+    while not (sim.all_bullets and any(isinstance(s, Effect) for s in sim.all_sprites)):
+        sim.step()
+
+    copy = Snapshot.load(Snapshot.save(sim, tmp_path / "mid.tdss"))
+
+    assert (tmp_path / "mid.tdss").stat().st_size < 2048
+    assert _full_state(copy) == _full_state(sim)
+    for _ in range(1200):
+        sim.step()
+        copy.step()
+    assert _full_state(copy) == _full_state(sim)
+
+
+def test_snapshot_rejects_other_data():
+    import pytest
+
+    from main import Snapshot
+
+    with pytest.raises(ValueError):
+        Snapshot.loads(b"TDIN" + bytes(64))
+
+
+def test_snapshot_only_resolves_registered_names():
+    import pytest
+
+    from main import Simulation, Snapshot, Viking
+
+    sim = Simulation()
+    sim.add_enemy(Viking(parent=sim))
+    data = Snapshot.dumps(sim)
+    Snapshot.loads(data)
+
+    # Any other module-level name is refused, not bound as a route.
+    with pytest.raises(ValueError, match="unknown name"):
+        Snapshot.loads(data.replace(b"get_path", b"Snapshot"))
+
+    sim.add_enemy(Viking(parent=sim, route=lambda: iter([(0, 0), (10, 0)])))
+    with pytest.raises(ValueError, match="cannot snapshot"):
+        Snapshot.dumps(sim)
+
+
+def _wave_file(tmp_path, waves, **extra):
+    import json
+
+    path = tmp_path / "waves.json"
+    path.write_text(json.dumps({"waves": waves, **extra}))
+    return path
+
+
+def test_wave_file_mixes_groups_with_bursts_and_hp_scaling(tmp_path):
+    from main import Golem, Simulation, Viking
+
+    path = _wave_file(tmp_path, [{"hp_scale": 2.0, "groups": [
+        {"enemy": "Viking", "count": 6, "interval_ms": 1000, "burst": 3},
+        {"enemy": "Golem", "count": 2, "interval_ms": 500, "delay_ms": 200},
+    ]}])
+    sim = Simulation(waves=path)
+
+    assert sim.wave_count == 1
+    assert len(sim.scheduler) == 2 and sim._wave_pending_spawns == 8
+    sim.run(max_seconds=(sim.WAVE_FIRST_DELAY_MS + 100) / 1000)
+    assert [type(e) for e in sim.all_enemies] == [Viking] * 3
+    sim.run(max_seconds=(sim.WAVE_FIRST_DELAY_MS + 1100) / 1000)
+    kinds = sorted(type(e).__name__ for e in sim.all_enemies)
+    assert kinds == ["Golem"] * 2 + ["Viking"] * 6
+    assert {e.max_hp for e in sim.all_enemies} == {2 * Golem.MAX_HP, 2 * Viking.MAX_HP}
+    assert sim._wave_pending_spawns == 0 and len(sim.scheduler) == 0
+
+
+def test_huge_wave_is_one_lazily_expanded_scheduler_entry(tmp_path):
+    from main import Simulation
+
+    path = _wave_file(tmp_path, [{"groups": [
+        {"enemy": "Viking", "count": 5000, "interval_ms": 100, "burst": 50},
+    ]}])
+    sim = Simulation(waves=path)
+
+    assert len(sim.scheduler) == 1 and sim._wave_pending_spawns == 5000
+    sim.run(max_seconds=sim.WAVE_FIRST_DELAY_MS / 1000 + 0.45)
+    assert len(sim.all_enemies) == 250
+    assert len(sim.scheduler) == 1 and sim._wave_pending_spawns == 4750
+
+
+def test_endless_waves_repeat_the_last_one_scaled():
+    import math
+
+    from main import Simulation, Viking, Waves
+
+    waves = Waves({
+        "waves": [{"groups": [{"enemy": "Viking", "count": 10}]}],
+        "endless": {"hp_growth": 1.5, "count_growth": 2.0},
+    })
+    sim = Simulation(waves=waves)
+
+    assert sim.wave_count == math.inf and not sim.finished
+    assert sim.wave_label() == "1"
+    (group,) = waves.groups(3)
+    assert group["enemy"] is Viking
+    assert group["count"] == 40 and group["hp_scale"] == 2.25
+
+
+def test_wave_file_only_names_enemy_types():
+    import pytest
+
+    from main import Simulation, Waves
+
+    with pytest.raises(ValueError, match="Effect"):
+        Waves({"waves": [{"groups": [{"enemy": "Effect", "count": 1}]}]})
+
+    sim = Simulation()
+    assert sim.wave_label(" / ") == f"1 / {sim.wave_count}"
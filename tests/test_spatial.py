@@ -0,0 +1,90 @@
+"""Tests for the enemy spatial hash used by targeting and bullet hits."""
+from __future__ import annotations
+
+import os
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+
+class _StubEnemy(pygame.sprite.Sprite):
+    def __init__(self, center, size=(40, 60)):
+        super().__init__()
+        self.rect = pygame.Rect((0, 0), size)
+        self.rect.center = center
+
+
+def _sim_with(enemies):
+    from main import Simulation
+
+    sim = Simulation()
+    # Stubs skip add_enemy (no EnemyStore row), so record their extent here.
+    sim.all_enemies.add(*enemies)
+    sim._enemy_extent = (
+        max(e.rect.width // 2 + 1 for e in enemies),
+        max(e.rect.height // 2 + 1 for e in enemies),
+    )
+    sim._index_enemies()
+    return sim
+
+
+def test_spatial_hash_query_returns_items_in_touched_cells():
+    from main import SpatialHash
+
+    grid = SpatialHash(cell_size=10)
+    grid.insert("a", 5, 5)
+    grid.insert("b", 25, 5)
+    grid.insert("c", -5, -5)
+
+    assert sorted(grid.query(0, 0, 19, 19)) == ["a"]
+    assert sorted(grid.within((10, 5), 12)) == ["a", "b", "c"]
+
+
+def test_nearest_enemy_matches_brute_force():
+    from main import closest_enemy
+
+    rng = random.Random(7)
+    enemies = [
+        _StubEnemy((rng.randint(-50, 1850), rng.randint(-50, 650))) for _ in range(300)
+    ]
+    sim = _sim_with(enemies)
+
+    for _ in range(100):
+        pos = (rng.randint(0, 1800), rng.randint(0, 600))
+        expected = closest_enemy(pos, enemies, 200)
+        chosen = sim.nearest_enemy(pos, 200)
+        if expected is None:
+            assert chosen is None
+        else:
+            # Ties may resolve differently; the distance must not.
+            assert chosen is not None
+            assert chosen.rect.center == expected.rect.center or (
+                _d2(chosen, pos) == _d2(expected, pos)
+            )
+
+
+def _d2(enemy, pos):
+    return (enemy.rect.centerx - pos[0]) ** 2 + (enemy.rect.centery - pos[1]) ** 2
+
+
+def test_enemies_at_finds_every_rect_under_the_point():
+    big = _StubEnemy((100, 100), size=(80, 80))
+    small = _StubEnemy((130, 130), size=(10, 10))
+    far = _StubEnemy((400, 100))
+    sim = _sim_with([big, small, far])
+
+    hits = [e for e in sim.enemies_at(131, 131) if e.rect.collidepoint(131, 131)]
+
+    assert set(hits) == {big, small}
+
+
+def test_dead_enemies_are_skipped_until_the_next_rebuild():
+    e = _StubEnemy((100, 100))
+    sim = _sim_with([e])
+    e.kill()
+
+    assert sim.nearest_enemy((100, 100), 50) is None
+    assert sim.enemies_near((100, 100), 50) == []